@@ -0,0 +1,4 @@
+"""
+Benchmark tools for the SRT Subtitle Translator.
+Contains a mock Ollama server and a throughput benchmark harness.
+"""
@@ -0,0 +1,300 @@
+"""
+模擬 Ollama 的 OpenAI 相容伺服器，用於測試與效能評測。
+
+提供 /v1/chat/completions、原生的 /api/chat 與 /v1/models，可設定延遲分布、錯誤率與並行上限
+（超過上限的請求會排隊，與 OLLAMA_NUM_PARALLEL 的行為相同）。
+設定 --load-latency 時模擬模型冷啟動：模型閒置超過 keep_alive 後，下一個請求需等待載入。
+另提供 GET /_stats 取得伺服器端延遲統計、POST /_reset 清除統計。
+
+用法：
+    python -m benchmarks.mock_ollama --port 11434 --latency lognormal:-1.5,0.5 --error-rate 0.01 --max-concurrency 5
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+_NUMBERED_RE = re.compile(r'^\s*\[(\d+)\]\s?(.*)$')
+_LANGUAGE_CODE_RE = re.compile(r'\[([A-Za-z0-9_-]+)\] ')
+# Ollama 預設的 keep_alive（秒）
+DEFAULT_KEEP_ALIVE = 300.0
+_DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+def parse_keep_alive(value):
+    """解析 keep_alive（秒數或 "30m"、"1h" 等），負值表示永久保持載入"""
+    if value is None:
+        return DEFAULT_KEEP_ALIVE
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        match = re.match(r'^\s*(-?[\d.]+)\s*(ms|s|m|h)?\s*$', str(value))
+        if not match:
+            return DEFAULT_KEEP_ALIVE
+        seconds = float(match.group(1)) * _DURATION_UNITS[match.group(2) or 's']
+    return float('inf') if seconds < 0 else seconds
+
+
+def parse_latency(spec):
+    """解析延遲分布設定，回傳產生延遲秒數的函式
+
+    fixed:0.2            固定 0.2 秒
+    uniform:0.1,0.5      0.1 到 0.5 秒均勻分布
+    lognormal:-1.5,0.5   對數常態分布（mu, sigma）
+    """
+    kind, _, args = spec.partition(':')
+    values = [float(v) for v in args.split(',') if v]
+    if kind == 'fixed':
+        return lambda: values[0]
+    if kind == 'uniform':
+        return lambda: random.uniform(values[0], values[1])
+    if kind == 'lognormal':
+        return lambda: random.lognormvariate(values[0], values[1])
+    raise ValueError(f"未知的延遲分布: {spec}")
+
+
+def percentile(values, pct):
+    """計算百分位數（最近秩法）"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def fake_translate(text):
+    """模擬翻譯：加上前綴，保留換行"""
+    return "譯:" + text
+
+
+def build_reply(user_content):
+    """依請求內容產生回覆；打包請求逐行回覆相同編號，多語言請求每個語言各一行"""
+    lines = user_content.split('\n')
+    numbered = [_NUMBERED_RE.match(line) for line in lines]
+    codes = _LANGUAGE_CODE_RE.findall(lines[0]) if "languages:" in lines[0] else []
+    if codes:
+        return '\n'.join(
+            f"[{match.group(1)}][{code}] {fake_translate(match.group(2))}"
+            for match in numbered[1:] if match for code in codes
+        )
+    if any(numbered):
+        return '\n'.join(
+            f"[{match.group(1)}] {fake_translate(match.group(2))}" for match in numbered if match
+        )
+    # 單句請求：第一行為指示，其餘為原文
+    return fake_translate('\n'.join(lines[1:]) if len(lines) > 1 else user_content)
+
+
+class MockOllamaServer:
+    """在背景執行緒中執行的模擬伺服器"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency='fixed:0.05', per_token_latency=0.0,
+                 error_rate=0.0, max_concurrency=5, models=("mock-model:latest",), load_latency=0.0):
+        self.latency = parse_latency(latency)
+        self.per_token_latency = per_token_latency
+        self.error_rate = error_rate
+        self.models = list(models)
+        self.load_latency = load_latency
+        self._load_lock = threading.Lock()
+        # 已載入的模型與其卸載時間
+        self._loaded_until = {}
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.reset()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset(self):
+        with self._lock:
+            self.latencies = []
+            self.requests = 0
+            self.errors = 0
+            self.connections = set()
+            self.max_in_flight = 0
+            self._in_flight = 0
+            self.model_loads = 0
+
+    def stats(self):
+        """伺服器端看到的請求延遲（含排隊時間）與計數"""
+        with self._lock:
+            latencies = list(self.latencies)
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "connections": len(self.connections),
+                "max_in_flight": self.max_in_flight,
+                "model_loads": self.model_loads,
+                "latency_p50": percentile(latencies, 50),
+                "latency_p95": percentile(latencies, 95),
+                "latency_p99": percentile(latencies, 99),
+                "latency_mean": sum(latencies) / len(latencies) if latencies else None
+            }
+
+    def ensure_loaded(self, model):
+        """模型未載入時等待載入，同時到達的請求只載入一次"""
+        with self._load_lock:
+            if time.monotonic() < self._loaded_until.get(model, 0):
+                return
+            if self.load_latency:
+                time.sleep(self.load_latency)
+            with self._lock:
+                self.model_loads += 1
+            self._loaded_until[model] = float('inf')
+
+    def touch(self, model, keep_alive):
+        """請求完成後重新計算卸載時間"""
+        with self._load_lock:
+            self._loaded_until[model] = time.monotonic() + keep_alive
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # keep-alive 連線上標頭與內容分兩次送出，Nagle 演算法加上用戶端的延遲 ACK
+            # 會讓每個回應多等數十毫秒，量到的是這段停頓而不是翻譯引擎
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, payload):
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _read_json(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'{}')
+
+            def do_GET(self):
+                if self.path == '/v1/models':
+                    self._send_json(200, {
+                        "object": "list",
+                        "data": [{"id": model, "object": "model"} for model in server.models]
+                    })
+                elif self.path == '/_stats':
+                    self._send_json(200, server.stats())
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def do_POST(self):
+                payload = self._read_json()
+                if self.path == '/_reset':
+                    server.reset()
+                    self._send_json(200, {})
+                elif self.path == '/v1/chat/completions':
+                    self._chat(payload, native=False)
+                elif self.path == '/api/chat':
+                    self._chat(payload, native=True)
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def _chat(self, payload, native):
+                started = time.monotonic()
+                model = payload.get("model")
+                keep_alive = parse_keep_alive(payload.get("keep_alive") if native else None)
+                messages = payload.get("messages", [])
+                if native and not messages:
+                    # 沒有訊息的原生請求只載入模型
+                    server.ensure_loaded(model)
+                    server.touch(model, keep_alive)
+                    self._send_json(200, {"model": model, "message": {"role": "assistant", "content": ""},
+                                          "done": True, "done_reason": "load"})
+                    return
+                with server._lock:
+                    server.requests += 1
+                    server.connections.add(self.client_address)
+                user_content = messages[-1]["content"] if messages else ""
+                prompt_text = "".join(m.get("content", "") for m in messages)
+                server.ensure_loaded(model)
+                with server._slots:
+                    with server._lock:
+                        server._in_flight += 1
+                        server.max_in_flight = max(server.max_in_flight, server._in_flight)
+                    try:
+                        reply = build_reply(user_content)
+                        time.sleep(server.latency() + server.per_token_latency * len(reply))
+                        failed = random.random() < server.error_rate
+                    finally:
+                        with server._lock:
+                            server._in_flight -= 1
+                server.touch(model, keep_alive)
+                with server._lock:
+                    server.latencies.append(time.monotonic() - started)
+                    if failed:
+                        server.errors += 1
+                if failed:
+                    self._send_json(500, {"error": "mock failure"})
+                    return
+                if native:
+                    self._send_json(200, {
+                        "model": model,
+                        "message": {"role": "assistant", "content": reply},
+                        "done": True,
+                        "prompt_eval_count": len(prompt_text),
+                        "eval_count": len(reply)
+                    })
+                    return
+                self._send_json(200, {
+                    "id": "chatcmpl-mock",
+                    "object": "chat.completion",
+                    "model": payload.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                    # 以字元數近似 token 數
+                    "usage": {
+                        "prompt_tokens": len(prompt_text),
+                        "completion_tokens": len(reply),
+                        "total_tokens": len(prompt_text) + len(reply)
+                    }
+                })
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="模擬 Ollama 的 OpenAI 相容伺服器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", default="fixed:0.05", help="延遲分布：fixed:s、uniform:a,b 或 lognormal:mu,sigma")
+    parser.add_argument("--per-token-latency", type=float, default=0.0, help="每個輸出字元額外的延遲秒數")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="回傳 500 的機率")
+    parser.add_argument("--max-concurrency", type=int, default=5, help="同時處理的請求上限，其餘排隊")
+    parser.add_argument("--load-latency", type=float, default=0.0, help="模型冷啟動的載入秒數")
+    args = parser.parse_args(argv)
+
+    server = MockOllamaServer(
+        args.host, args.port, args.latency, args.per_token_latency, args.error_rate, args.max_concurrency,
+        load_latency=args.load_latency
+    ).start()
+    print(f"Mock Ollama listening on {server.url}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+翻譯引擎的吞吐量評測。
+
+啟動模擬 Ollama 伺服器（獨立行程），以不同大小的合成 SRT 語料執行翻譯引擎，
+報告每秒字幕數、請求延遲 p50/p95/p99、峰值記憶體與總耗時，並輸出 JSON 以便跨 commit 比較。
+每個情境在獨立的子行程中執行，峰值記憶體互不影響。
+另外在全新的直譯器中量測 GUI 模組的載入時間（開啟視窗前的啟動耗時）。
+
+用法：
+    python -m benchmarks.run_benchmark --sizes 200,2000 --parallel-requests 5 --latency lognormal:-2.5,0.5
+    python -m benchmarks.run_benchmark --compare benchmarks/results/舊結果.json
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+_WORDS = (
+    "yes", "what", "I", "you", "don't", "know", "where", "we", "are", "going", "tonight", "the",
+    "captain", "said", "that", "nobody", "leaves", "this", "ship", "until", "morning", "wait",
+)
+
+
+def generate_srt(path, cues, seed=0):
+    """產生合成字幕：長短混合，部分為兩行字幕，含重複句"""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(cues):
+            start = i * 2000
+            if rng.random() < 0.15:
+                text = rng.choice(("Yes.", "What?", "Thank you.", "Let's go!"))
+            else:
+                words = rng.randint(2, 14)
+                text = " ".join(rng.choice(_WORDS) for _ in range(words)).capitalize()
+                if words > 9:
+                    cut = len(text) // 2
+                    text = text[:cut] + "\n" + text[cut:]
+            f.write(f"{i + 1}\n{_ts(start)} --> {_ts(start + 1500)}\n{text}\n\n")
+
+
+def _ts(ms):
+    seconds, millis = divmod(ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{millis:03d}"
+
+
+def peak_rss_mb():
+    """本行程的峰值常駐記憶體（MB）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 回報，macOS 以位元組回報
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_worker(args):
+    """子行程：產生語料並執行翻譯引擎，輸出 JSON 結果"""
+    from src.translation.translation_thread import TranslationThread
+    from src.translation.scheduler import TranslationScheduler
+    from src.translation.endpoint_pool import configure_endpoints
+    from src.translation.chat_backend import configure_backend
+
+    with tempfile.TemporaryDirectory(prefix="srt-bench-") as workdir:
+        files = []
+        for n in range(args.files):
+            path = os.path.join(workdir, f"episode_{n:03d}.srt")
+            generate_srt(path, args.cues, seed=n)
+            files.append(path)
+
+        configure_endpoints([args.host]).resize(args.parallel_requests)
+        backend = configure_backend(args.api)
+        scheduler = TranslationScheduler(
+            max_files=args.parallel_files, max_requests=args.parallel_requests, adaptive=args.adaptive
+        )
+        threads = []
+        started = time.perf_counter()
+        backend.warm_up("mock-model:latest")
+        for path in files:
+            thread = TranslationThread(
+                path, "English", "Traditional Chinese", "mock-model:latest", args.parallel_requests,
+                lambda current, total, extra_data=None: None, lambda message: None,
+                use_cache=False, pack_size=args.pack_size, conflict_policy="overwrite",
+                scheduler=scheduler
+            )
+            threads.append(thread)
+            scheduler.submit(thread)
+        scheduler.wait()
+        wall = time.perf_counter() - started
+
+    total_cues = args.cues * args.files
+    print(json.dumps({
+        "wall_time": wall,
+        "cues": total_cues,
+        "cues_per_sec": total_cues / wall if wall else None,
+        "failed_cues": sum(thread.failed_count for thread in threads),
+        "peak_rss_mb": peak_rss_mb()
+    }))
+
+
+def _http_json(url, method='GET'):
+    req = urllib.request.Request(url, data=b'{}' if method == 'POST' else None, method=method,
+                                 headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def start_mock_server(args):
+    """以子行程啟動模擬伺服器，回傳 (行程, 網址)"""
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.mock_ollama', '--port', '0',
+         '--latency', args.latency, '--error-rate', str(args.error_rate),
+         '--max-concurrency', str(args.server_concurrency),
+         '--per-token-latency', str(args.per_token_latency), '--load-latency', str(args.load_latency)],
+        cwd=ROOT, stdout=subprocess.PIPE, text=True
+    )
+    line = process.stdout.readline()
+    return process, line.strip().rsplit(' ', 1)[-1]
+
+
+# 在全新的直譯器中載入 GUI 模組並回報耗時（秒）
+_STARTUP_CODE = (
+    "import time; started = time.perf_counter(); import src.gui.app; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def measure_startup(runs):
+    """GUI 模組載入時間，回傳多次量測的中位數與最小值；無法載入（例如缺少 tkinter）時回傳 None"""
+    samples = []
+    for _ in range(runs):
+        try:
+            output = subprocess.check_output([sys.executable, '-c', _STARTUP_CODE], cwd=ROOT, text=True,
+                                             stderr=subprocess.DEVNULL)
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        samples.append(float(output.strip().splitlines()[-1]))
+    if not samples:
+        return None
+    samples.sort()
+    return {"import_median": samples[len(samples) // 2], "import_min": samples[0], "runs": len(samples)}
+
+
+def format_startup(startup):
+    return (f"GUI startup: import {startup['import_median'] * 1000:.0f}ms median, "
+            f"{startup['import_min'] * 1000:.0f}ms min ({startup['runs']} runs)")
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scenarios(args):
+    process, url = start_mock_server(args)
+    results = []
+    try:
+        for cues in args.sizes:
+            _http_json(url + '/_reset', 'POST')
+            command = [
+                sys.executable, '-m', 'benchmarks.run_benchmark', '--worker', '--host', url,
+                '--cues', str(cues), '--files', str(args.files),
+                '--parallel-requests', str(args.parallel_requests),
+                '--parallel-files', str(args.parallel_files), '--pack-size', str(args.pack_size),
+                '--api', args.api
+            ]
+            if args.adaptive:
+                command.append('--adaptive')
+            output = subprocess.check_output(command, cwd=ROOT, text=True)
+            result = json.loads(output.strip().splitlines()[-1])
+            result.update({"cues_per_file": cues, "files": args.files})
+            result["server"] = _http_json(url + '/_stats')
+            results.append(result)
+            print(format_result(result), flush=True)
+    finally:
+        process.terminate()
+        process.wait()
+    return results
+
+
+def format_result(result):
+    server = result["server"]
+
+    def ms(value):
+        return f"{value * 1000:.0f}ms" if value is not None else "-"
+
+    return (
+        f"{result['files']}x{result['cues_per_file']} cues: {result['cues_per_sec']:.1f} cues/s, "
+        f"wall {result['wall_time']:.2f}s, requests {server['requests']}, model loads {server['model_loads']}, "
+        f"p50 {ms(server['latency_p50'])} p95 {ms(server['latency_p95'])} p99 {ms(server['latency_p99'])}, "
+        f"peak RSS {result['peak_rss_mb']:.1f}MB"
+    )
+
+
+def compare(current, previous_path):
+    """與先前的結果比較每秒字幕數"""
+    with open(previous_path, 'r', encoding='utf-8') as f:
+        previous = json.load(f)
+    before = {(r["files"], r["cues_per_file"]): r for r in previous["results"]}
+    print(f"\n與 {previous.get('commit')} 比較:")
+    for result in current["results"]:
+        old = before.get((result["files"], result["cues_per_file"]))
+        if old and old.get("cues_per_sec"):
+            change = (result["cues_per_sec"] / old["cues_per_sec"] - 1) * 100
+            print(f"  {result['files']}x{result['cues_per_file']}: "
+                  f"{old['cues_per_sec']:.1f} -> {result['cues_per_sec']:.1f} cues/s ({change:+.1f}%)")
+    old, new = previous.get("startup"), current.get("startup")
+    if old and new:
+        print(f"  GUI startup: {old['import_median'] * 1000:.0f}ms -> {new['import_median'] * 1000:.0f}ms")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="SRT 翻譯引擎吞吐量評測")
+    parser.add_argument("--sizes", type=lambda v: [int(x) for x in v.split(',')], default=[200, 2000],
+                        help="每個檔案的字幕數，以逗號分隔")
+    parser.add_argument("--files", type=int, default=1, help="每個情境的檔案數")
+    parser.add_argument("--parallel-requests", type=int, default=5)
+    parser.add_argument("--parallel-files", type=int, default=2)
+    parser.add_argument("--pack-size", type=int, default=1)
+    parser.add_argument("--adaptive", action="store_true")
+    parser.add_argument("--latency", default="lognormal:-2.5,0.5", help="模擬伺服器的延遲分布")
+    parser.add_argument("--per-token-latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--load-latency", type=float, default=0.0, help="模擬模型冷啟動的載入秒數")
+    parser.add_argument("--api", choices=["openai", "native"], default="openai", help="翻譯引擎使用的對話 API")
+    parser.add_argument("--server-concurrency", type=int, default=5, help="模擬伺服器的並行上限")
+    parser.add_argument("--output", help="結果 JSON 路徑（預設寫入 benchmarks/results/）")
+    parser.add_argument("--compare", help="與先前的結果 JSON 比較")
+    parser.add_argument("--startup-runs", type=int, default=5, help="量測 GUI 啟動時間的次數（0 為不量測）")
+    # 內部使用：以子行程執行單一情境
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--host", help=argparse.SUPPRESS)
+    parser.add_argument("--cues", type=int, help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.worker:
+        run_worker(args)
+        return 0
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {key: value for key, value in vars(args).items()
+                   if key not in ("worker", "host", "cues", "output", "compare")},
+        "results": run_scenarios(args),
+        "startup": measure_startup(args.startup_runs) if args.startup_runs > 0 else None
+    }
+    if report["startup"]:
+        print(format_startup(report["startup"]), flush=True)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{report['commit'] or 'nogit'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"結果已保存至 {output}")
+    if args.compare:
+        compare(report, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
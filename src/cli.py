@@ -0,0 +1,525 @@
+"""
+無 GUI 的命令列入口，與 GUI 共用同一套翻譯引擎。
+
+用法：
+    python -m src.cli translate <檔案/資料夾/萬用字元> [選項]
+    python -m src.cli watch <資料夾> [選項]
+
+結束碼：0 全部成功，1 有檔案或字幕翻譯失敗，2 參數錯誤或找不到檔案，130 使用者中斷。
+"""
+import argparse
+import glob
+import os
+import sys
+import threading
+import time
+
+# 添加專案根目錄到 PATH，以便直接執行此檔案時可以導入模組
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.translation.scheduler import DEFAULT_MAX_FILES, DEFAULT_MAX_REQUESTS
+from src.translation.retry import DEFAULT_TIMEOUT, DEFAULT_MAX_RETRIES
+from src.translation.chat_backend import DEFAULT_KEEP_ALIVE
+from src.utils.srt_cleaner import DEFAULT_RULES as DEFAULT_CLEAN_RULES, RULES as CLEAN_RULES
+from src.utils.file_scanner import DEFAULT_INCLUDE, DEFAULT_EXCLUDE, parse_patterns
+from src.utils.folder_watcher import DEFAULT_SETTLE, DEFAULT_POLL_INTERVAL
+
+DEFAULT_MODEL = "huihui_ai/aya-expanse-abliterated:latest"
+DEFAULT_SOURCE_LANG = "Japanese"
+DEFAULT_TARGET_LANG = "Traditional Chinese"
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+
+def parse_targets(value):
+    """解析以逗號分隔的目標語言，保留順序並去除重複"""
+    targets = []
+    for language in (value or '').split(','):
+        language = language.strip()
+        if language and language not in targets:
+            targets.append(language)
+    return targets
+
+
+def expand_paths(patterns, target_langs, include=None, exclude=None):
+    """展開檔案、資料夾與萬用字元，回傳不重複的 SRT 檔案清單"""
+    from src.utils.file_utils import get_language_suffix
+    from src.utils.file_scanner import ScanFilter, scan_folder
+
+    if isinstance(target_langs, str):
+        target_langs = parse_targets(target_langs)
+    scan_filter = ScanFilter.for_target([get_language_suffix(lang) for lang in target_langs], include, exclude)
+    seen = set()
+    result = []
+
+    def add(path, explicit=False):
+        # 明確指定的檔案只需符合包含樣式；資料夾與萬用字元則套用排除樣式（例如已翻譯的輸出檔案）
+        matched = scan_filter.classify(os.path.basename(path))
+        if matched is None or (not explicit and not matched):
+            return
+        path = os.path.abspath(path)
+        if path not in seen:
+            seen.add(path)
+            result.append(path)
+
+    for pattern in patterns:
+        explicit = not glob.has_magic(pattern)
+        matches = glob.glob(pattern, recursive=True) or [pattern]
+        for match in sorted(matches):
+            if os.path.isdir(match):
+                for batch in scan_folder(match, scan_filter, sort=True):
+                    for path in batch:
+                        add(path)
+            elif os.path.isfile(match):
+                add(match, explicit)
+    return result
+
+
+class _CliJob:
+    """一個原始檔案的翻譯工作。翻譯執行緒在開始處理時才以 factory(path) 建立，
+    完成後只保留每個目標語言的 (語言, 輸出路徑, 失敗句數)，大量檔案排隊時記憶體不隨之增長"""
+    __slots__ = ('path', 'factory', 'targets', 'error', 'outputs')
+
+    def __init__(self, path, factory, targets):
+        self.path = sys.intern(path)
+        self.factory = factory
+        self.targets = targets
+        self.error = None
+        self.outputs = ()
+
+    def run(self):
+        threads = ()
+        try:
+            runner, threads = self.factory(self.path)
+            runner.run()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.outputs = tuple(
+                (thread.target_lang, thread.output_path, thread.failed_count) for thread in threads
+            ) or tuple((target, None, 0) for target in self.targets)
+
+
+def _make_progress(file_path, log, label=None):
+    """每個檔案每 10% 輸出一次進度"""
+    state = {"step": -1}
+    name = os.path.basename(file_path) + (f" [{label}]" if label else "")
+
+    def progress(current, total, extra_data=None):
+        if total > 0 and current >= 0:
+            step = current * 10 // total
+            if step != state["step"]:
+                state["step"] = step
+                log(f"[{current}/{total}] {name}")
+
+    return progress
+
+
+def format_metrics(data):
+    """單行的統計摘要"""
+    counters = data["counters"]
+    latency = data["latency"]
+
+    def seconds(value):
+        return f"{value:.2f}s" if value is not None else "-"
+
+    return (
+        f"請求 {counters['requests']}（錯誤 {counters['request_errors']}，重試 {counters['retries']}）"
+        f"，延遲 p50 {seconds(latency['p50'])} p95 {seconds(latency['p95'])} p99 {seconds(latency['p99'])}"
+        f"，token {counters['prompt_tokens']}+{counters['completion_tokens']}"
+        f"，快取命中 {counters['cache_hits']}/{counters['cache_hits'] + counters['cache_misses']}"
+    )
+
+
+class _UsageError(Exception):
+    """命令列參數錯誤"""
+
+
+def _configure_profiler(args):
+    from src.utils.profiling import get_profiler, parse_modes
+
+    profiler = get_profiler()
+    if args.profile:
+        try:
+            profiler.configure(parse_modes(args.profile), args.profile_dir)
+        except ValueError as e:
+            raise _UsageError(str(e))
+    return profiler
+
+
+def _start_engine(args):
+    """依參數設定排程器、主機、對話格式與統計輸出，回傳 (排程器, 重試策略, 統計寫出器)"""
+    from src.translation.scheduler import TranslationScheduler
+    from src.translation.endpoint_pool import get_client, configure_endpoints, parse_hosts
+    from src.translation.retry import RetryPolicy
+    from src.translation.metrics import get_metrics, MetricsDumper, start_prometheus_server
+    from src.translation.chat_backend import configure_backend
+
+    retry_policy = RetryPolicy(timeout=args.timeout, max_retries=args.retries)
+    scheduler = TranslationScheduler(
+        max_files=args.parallel_files, max_requests=args.parallel_requests, adaptive=args.adaptive
+    )
+    if args.host:
+        configure_endpoints(parse_hosts(','.join(args.host)))
+    get_client().resize(scheduler.max_requests)
+    backend = configure_backend(args.api, args.keep_alive, args.num_ctx, args.num_predict)
+    # 清理與排程的同時在背景載入模型
+    backend.warm_up(args.model)
+
+    metrics = get_metrics()
+    metrics.bind_scheduler(scheduler)
+    if args.metrics_port is not None:
+        try:
+            start_prometheus_server(metrics, args.metrics_port, args.metrics_host)
+        except OSError as e:
+            raise _UsageError(f"無法啟動統計端點: {str(e)}")
+    dumper = None
+    if args.metrics_json:
+        dumper = MetricsDumper(metrics, args.metrics_json, args.metrics_interval)
+        dumper.start()
+    return scheduler, retry_policy, dumper
+
+
+def _make_logger(args):
+    print_lock = threading.Lock()
+
+    def log(message):
+        if not args.quiet:
+            with print_lock:
+                print(message, flush=True)
+
+    return log
+
+
+def _clean_rules(args):
+    from src.utils.srt_cleaner import parse_rules
+
+    try:
+        return parse_rules(args.clean_rules)
+    except ValueError as e:
+        raise _UsageError(str(e))
+
+
+def _targets(args):
+    targets = parse_targets(args.target)
+    if not targets:
+        raise _UsageError("請指定目標語言")
+    if len(targets) > 1 and args.replace_original:
+        raise _UsageError("多個目標語言不能與 --replace-original 同時使用")
+    return targets
+
+
+def _create_thread(args, file_path, target_lang, scheduler, retry_policy, log, label=None):
+    from src.translation.translation_thread import TranslationThread
+
+    return TranslationThread(
+        file_path,
+        args.source,
+        target_lang,
+        args.model,
+        args.parallel_requests,
+        _make_progress(file_path, log, label),
+        log,
+        args.debug,
+        args.replace_original,
+        use_alt_prompt=args.alt_prompt,
+        scheduler=scheduler,
+        use_cache=not args.no_cache,
+        pack_size=args.pack_size,
+        conflict_policy=args.on_conflict,
+        retry_policy=retry_policy,
+        incremental=not args.full
+    )
+
+
+def _create_job(args, file_path, targets, scheduler, retry_policy, log):
+    """建立一個檔案的翻譯工作，回傳 (可執行的工作, 各語言的 TranslationThread)；
+    多個目標語言時只解析一次原始檔案，共用請求預算"""
+    from src.translation.multi_target import MultiTargetJob
+
+    if len(targets) == 1:
+        thread = _create_thread(args, file_path, targets[0], scheduler, retry_policy, log)
+        return thread, [thread]
+    threads = [
+        _create_thread(args, file_path, target, scheduler, retry_policy, log, label=target)
+        for target in targets
+    ]
+    return MultiTargetJob(threads, pack_languages=args.pack_languages), threads
+
+
+def _write_profile(profiler, log):
+    if profiler.enabled:
+        report = profiler.report()
+        report_path = profiler.write_report(report)
+        log(profiler.format_report(report))
+        log(f"效能剖析報告已保存至 {os.path.dirname(report_path)}")
+
+
+def cmd_translate(args):
+    from src.translation.metrics import get_metrics
+    from src.utils.srt_cleaner import clean_files, format_rule_stats
+
+    try:
+        profiler = _configure_profiler(args)
+        targets = _targets(args)
+        files = expand_paths(args.paths, targets,
+                             parse_patterns(args.include) or None, parse_patterns(args.exclude) or None)
+        if not files:
+            raise _UsageError("找不到可翻譯的 SRT 檔案")
+        rules = _clean_rules(args) if args.clean else None
+        scheduler, retry_policy, dumper = _start_engine(args)
+    except _UsageError as e:
+        print(str(e), file=sys.stderr)
+        return EXIT_USAGE
+    log = _make_logger(args)
+
+    try:
+        if args.clean:
+            # 先以行程池平行清理所有檔案，再開始翻譯
+            with profiler.span("clean"):
+                for file_path, result, error in clean_files(files, args.replace_original, rules):
+                    if error is not None:
+                        print(str(error), file=sys.stderr)
+                        return EXIT_FAILED
+                    log(f"已清理 {file_path}: 保留 {result['cleaned']}/{result['total']} 句"
+                        f"（{format_rule_stats(result['rules']) or '無變更'}）")
+
+        def factory(file_path):
+            return _create_job(args, file_path, targets, scheduler, retry_policy, log)
+
+        jobs = []
+        for file_path in files:
+            job = _CliJob(file_path, factory, targets)
+            jobs.append(job)
+            scheduler.submit(job)
+
+        try:
+            scheduler.wait()
+        except KeyboardInterrupt:
+            print("已中斷", file=sys.stderr)
+            return EXIT_INTERRUPTED
+    finally:
+        if dumper is not None:
+            dumper.stop()
+
+    # 每個 (檔案, 目標語言) 各算一個結果
+    outputs = [(job, *output) for job in jobs for output in job.outputs]
+    failed = [(job, target) for job, target, _, _ in outputs if job.error is not None]
+    for job, target in failed:
+        print(f"翻譯失敗: {job.path} [{target}]: {job.error}", file=sys.stderr)
+    # 部分字幕翻譯失敗的檔案，重新執行時只會重譯失敗的字幕
+    partial = [(output_path, count) for job, _, output_path, count in outputs if job.error is None and count]
+    for output_path, count in partial:
+        print(f"{count} 句翻譯失敗: {output_path}", file=sys.stderr)
+    translated = sum(1 for job, _, output_path, _ in outputs if job.error is None and output_path)
+    skipped = len(outputs) - translated - len(failed)
+    log(f"完成：翻譯 {translated} 個檔案，跳過 {skipped} 個，失敗 {len(failed)} 個")
+    log(format_metrics(get_metrics().snapshot()))
+    _write_profile(profiler, log)
+    return EXIT_FAILED if failed or partial else EXIT_OK
+
+
+class _WatchJob:
+    """監看模式的翻譯工作：可選擇先清理，完成後通知監看器"""
+
+    def __init__(self, runner, threads, watcher, stats, clean_rules=None):
+        self.runner = runner
+        self.threads = threads
+        self.watcher = watcher
+        self.stats = stats
+        self.clean_rules = clean_rules
+
+    def run(self):
+        from src.utils.file_utils import clean_srt_file
+
+        file_path = self.threads[0].file_path
+        replace_original = self.threads[0].replace_original
+        try:
+            if self.clean_rules is not None:
+                clean_srt_file(file_path, replace_original, self.clean_rules)
+            self.runner.run()
+            keys = [
+                "failed" if thread.failed_count else "translated" if thread.output_path else "skipped"
+                for thread in self.threads
+            ]
+        except Exception as e:
+            print(f"翻譯失敗: {file_path}: {e}", file=sys.stderr)
+            keys = ["failed"] * len(self.threads)
+        finally:
+            # 清理或取代原始檔案時原始檔案會被改寫，不應再次觸發翻譯
+            self.watcher.mark_done(file_path, rewritten=self.clean_rules is not None or replace_original)
+        for key in keys:
+            self.stats[key] += 1
+
+
+def _interrupt_on_sigterm():
+    """讓 SIGTERM（例如 docker stop）與 Ctrl+C 一樣結束監看"""
+    import signal
+
+    def handler(signum, frame):
+        raise KeyboardInterrupt
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, handler)
+
+
+def cmd_watch(args):
+    from src.translation.metrics import get_metrics
+    from src.utils.file_scanner import ScanFilter
+    from src.utils.file_utils import get_language_suffix, get_output_path
+    from src.utils.folder_watcher import FolderWatcher
+
+    folders = [os.path.abspath(path) for path in args.paths]
+    try:
+        missing = [path for path in folders if not os.path.isdir(path)]
+        if missing:
+            raise _UsageError(f"找不到資料夾: {', '.join(missing)}")
+        profiler = _configure_profiler(args)
+        targets = _targets(args)
+        rules = _clean_rules(args) if args.clean else None
+        scheduler, retry_policy, dumper = _start_engine(args)
+    except _UsageError as e:
+        print(str(e), file=sys.stderr)
+        return EXIT_USAGE
+    log = _make_logger(args)
+    stats = {"translated": 0, "skipped": 0, "failed": 0}
+    # 目標語言的輸出檔案（get_output_path 產生的後綴與重新命名的 _1、_2…）不會被當成新字幕
+    scan_filter = ScanFilter.for_target(
+        [get_language_suffix(target) for target in targets],
+        parse_patterns(args.include) or None, parse_patterns(args.exclude) or None
+    )
+
+    def translated_before(file_path):
+        """每個目標語言的輸出檔案都存在且不比原始檔案舊"""
+        source_mtime = os.path.getmtime(file_path)
+        for target in targets:
+            output_path = get_output_path(file_path, target)
+            if not os.path.exists(output_path) or os.path.getmtime(output_path) < source_mtime:
+                return False
+        return True
+
+    def on_file(file_path, initial):
+        if initial and not args.existing:
+            # 啟動時已存在的檔案：取代原始檔案模式無法判斷是否翻譯過，一律略過；
+            # 否則只處理沒有輸出檔案或輸出檔案比原始檔案舊的字幕
+            if args.replace_original or translated_before(file_path):
+                return False
+        log(f"排入翻譯: {file_path}")
+        runner, threads = _create_job(args, file_path, targets, scheduler, retry_policy, log)
+        scheduler.submit(_WatchJob(runner, threads, watcher, stats, rules))
+        return True
+
+    watcher = FolderWatcher(
+        folders, scan_filter, on_file, settle=args.settle,
+        poll_interval=args.poll_interval, use_inotify=not args.polling
+    )
+    _interrupt_on_sigterm()
+    watcher.start()
+    log(f"監看中（{watcher.backend.name}）: {', '.join(folders)}，按 Ctrl+C 結束")
+    try:
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            watcher.stop()
+            if scheduler.pending:
+                log(f"停止監看，等待 {scheduler.pending} 個檔案完成（再按一次 Ctrl+C 立即結束）")
+            scheduler.wait()
+    except KeyboardInterrupt:
+        print("已中斷", file=sys.stderr)
+        return EXIT_INTERRUPTED
+    finally:
+        if dumper is not None:
+            dumper.stop()
+
+    log(f"完成：翻譯 {stats['translated']} 個檔案，跳過 {stats['skipped']} 個，失敗 {stats['failed']} 個")
+    log(format_metrics(get_metrics().snapshot()))
+    _write_profile(profiler, log)
+    return EXIT_FAILED if stats["failed"] else EXIT_OK
+
+
+def _add_common_arguments(parser):
+    """translate 與 watch 共用的選項"""
+    parser.add_argument("--include", help=f"資料夾中要翻譯的檔名樣式，以逗號分隔（預設 {','.join(DEFAULT_INCLUDE)}）")
+    parser.add_argument("--exclude", help=f"要略過的檔名樣式，以 / 結尾表示資料夾（預設 {','.join(DEFAULT_EXCLUDE)}，"
+                                          f"並一律略過目標語言的輸出檔案）")
+    parser.add_argument("-s", "--source", default=DEFAULT_SOURCE_LANG, help="原文語言")
+    parser.add_argument("-t", "--target", default=DEFAULT_TARGET_LANG,
+                        help="目標語言；多個語言以逗號分隔時只解析一次原始檔案，並寫出每個語言的輸出檔案")
+    parser.add_argument("--pack-languages", action="store_true",
+                        help="多個目標語言時，把同一句字幕的所有語言合併成一個請求")
+    parser.add_argument("-m", "--model", default=DEFAULT_MODEL, help="翻譯模型")
+    parser.add_argument("--host", action="append",
+                        help="Ollama 主機網址，可重複指定以分散到多台主機（預設取自 OLLAMA_HOSTS 或 localhost:11434）")
+    parser.add_argument("-p", "--parallel-requests", type=int, default=DEFAULT_MAX_REQUESTS, help="所有檔案共用的並行請求數")
+    parser.add_argument("-f", "--parallel-files", type=int, default=DEFAULT_MAX_FILES, help="同時翻譯的檔案數")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="依延遲與錯誤率自動調整並行請求數，--parallel-requests 為上限")
+    parser.add_argument("--api", choices=["openai", "native"],
+                        help="對話 API：openai（/v1/chat/completions）或 native（Ollama /api/chat，"
+                             "支援 keep-alive 與預先載入）；預設取自 OLLAMA_API 或 openai")
+    parser.add_argument("--keep-alive", default=DEFAULT_KEEP_ALIVE,
+                        help="原生模式下模型保持載入的時間，例如 30m、1h 或 -1（永久）")
+    parser.add_argument("--num-ctx", type=int, help="原生模式的上下文長度（num_ctx）")
+    parser.add_argument("--num-predict", type=int, help="原生模式每個請求的最大輸出 token 數（num_predict）")
+    parser.add_argument("--pack-size", type=int, default=1, help="每次請求打包的字幕句數")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="每個請求的逾時秒數")
+    parser.add_argument("--retries", type=int, default=DEFAULT_MAX_RETRIES, help="可重試錯誤的最大重試次數")
+    parser.add_argument("--replace-original", action="store_true", help="取代原始檔案（自動備份）")
+    parser.add_argument("--clean", action="store_true", help="翻譯前清理字幕")
+    parser.add_argument("--clean-rules", default=",".join(DEFAULT_CLEAN_RULES),
+                        help=f"清理規則，以逗號分隔（可用：{', '.join(CLEAN_RULES)}）")
+    parser.add_argument("--no-cache", action="store_true", help="不使用翻譯快取")
+    parser.add_argument("--full", action="store_true",
+                        help="忽略上次的翻譯清單（*.manifest.json），重新翻譯所有字幕")
+    parser.add_argument("--alt-prompt", action="store_true", help="使用替代提示詞")
+    parser.add_argument("--debug", action="store_true", help="輸出每句的翻譯內容")
+    parser.add_argument("--metrics-json", help="定期將執行期統計寫入此 JSON 檔案")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="寫入統計 JSON 的間隔秒數")
+    parser.add_argument("--metrics-port", type=int, help="在此連接埠提供 Prometheus 格式的 /metrics 端點")
+    parser.add_argument("--metrics-host", default="127.0.0.1",
+                        help="/metrics 端點綁定的位址（預設僅本機；設為 0.0.0.0 才開放區網存取）")
+    parser.add_argument("--profile", nargs="?", const="spans", metavar="MODES",
+                        help="效能剖析：spans（各階段計時）、cprofile、tracemalloc，以逗號分隔；"
+                             "也可用環境變數 SRT_TRANSLATOR_PROFILE 啟用")
+    parser.add_argument("--profile-dir", help="效能剖析報告的目錄（預設 ~/.srt_translator/profiles）")
+    parser.add_argument("-q", "--quiet", action="store_true", help="只輸出錯誤")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="SRT 字幕翻譯器（命令列模式）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    translate = subparsers.add_parser("translate", help="翻譯 SRT 檔案")
+    translate.add_argument("paths", nargs="+", help="SRT 檔案、資料夾或萬用字元（支援 **）")
+    translate.add_argument("--on-conflict", choices=["overwrite", "rename", "skip"], default="rename",
+                           help="輸出檔案已存在時的處理方式")
+    _add_common_arguments(translate)
+    translate.set_defaults(func=cmd_translate)
+
+    watch = subparsers.add_parser("watch", help="監看資料夾，自動翻譯新增或變更的 SRT 檔案")
+    watch.add_argument("paths", nargs="+", help="要監看的資料夾（包含子資料夾）")
+    watch.add_argument("--on-conflict", choices=["overwrite", "rename", "skip"], default="overwrite",
+                       help="輸出檔案已存在時的處理方式（預設覆寫，原始字幕更新時重新翻譯）")
+    watch.add_argument("--existing", action="store_true",
+                       help="啟動時翻譯所有已存在的檔案（預設只翻譯沒有輸出或輸出較舊的檔案）")
+    watch.add_argument("--settle", type=float, default=DEFAULT_SETTLE,
+                       help="檔案在此秒數內沒有變化才視為寫入完成")
+    watch.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                       help="輪詢模式的掃描間隔秒數")
+    watch.add_argument("--polling", action="store_true", help="不使用 inotify，一律以輪詢監看（例如網路磁碟）")
+    _add_common_arguments(watch)
+    watch.set_defaults(func=cmd_watch)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
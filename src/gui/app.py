@@ -2,21 +2,35 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, Menu
 import os
 import sys
+import threading
 from queue import Queue
-
-from src.utils.file_utils import ensure_backup_dir, clean_srt_file
-
-# 嘗試導入 tkinterdnd2，如果失敗則使用基本的 tkinter
-try:
-    from tkinterdnd2 import *
-    TKDND_AVAILABLE = True
-except ImportError:
-    TKDND_AVAILABLE = False
-    print("警告：未安裝 tkinterdnd2 模組，拖放功能將被停用")
-
-from src.translation.translation_thread import TranslationThread
-
-class App(TkinterDnD.Tk if TKDND_AVAILABLE else tk.Tk):
+from collections import deque
+
+from src.utils.srt_cleaner import clean_files, merge_stats, format_rule_stats
+from src.utils.file_scanner import ScanFilter, scan_folder
+from src.utils.file_utils import get_language_suffix
+
+# 這裡只匯入不需要網路與剖析模組的輕量模組；tkinterdnd2、翻譯執行緒、
+# HTTP 用戶端（endpoint_pool）與統計（metrics）在開始翻譯或更新統計時才載入，加快開啟視窗的速度
+from src.translation.scheduler import get_scheduler, DEFAULT_MAX_FILES
+from src.translation.chat_backend import get_backend, configure_backend
+from src.translation.model_list import load_cached_models, refresh_models
+from src.translation.job_table import JobTable, LazyJob
+from src.utils.profiling import get_profiler
+from src.gui.ui_events import UIEventQueue
+
+# 統計面板的更新間隔（毫秒）
+STATS_REFRESH_MS = 1000
+# 進度畫面的更新間隔（毫秒），約每秒 20 幀
+UI_FRAME_MS = 50
+# 狀態區顯示的最近檔案訊息數
+RECENT_MESSAGES = 5
+# 在 Listbox 中搜尋檔案時每次取出的項目數
+LIST_SEARCH_CHUNK = 200
+# 沒有保存的模型清單時的預設模型
+DEFAULT_MODEL = "huihui_ai/aya-expanse-abliterated:latest"
+
+class App(tk.Tk):
     def __init__(self):
         super().__init__()
         self.countdown_window = None
@@ -32,10 +46,16 @@ class App(TkinterDnD.Tk if TKDND_AVAILABLE else tk.Tk):
                 "target_lang_label": "目標語言:",
                 "model_label": "選擇模型:",
                 "parallel_label": "並行請求數:",
+                "parallel_files_label": "並行檔案數:",
+                "pack_size_label": "每次請求字幕數:",
                 "auto_clean": "翻譯前自動清理",
                 "debug_mode": "調試模式",
                 "clean_workspace": "翻譯後清理工作區",
                 "replace_original": "取代原始檔案",
+                "use_cache": "使用翻譯快取",
+                "adaptive_concurrency": "自動調整並行數",
+                "native_api": "原生 API（保持模型載入）",
+                "stats_line": "請求 {}/{} | 佇列 {} 檔 | 延遲 p50 {} p95 {} | {:.0f} token/s | 快取命中 {} | 重試 {}",
                 "start_translation": "開始翻譯",
                 "file_removed": "已從工作區移除選中的檔案",
                 "no_files": "警告",
@@ -45,8 +65,11 @@ class App(TkinterDnD.Tk if TKDND_AVAILABLE else tk.Tk):
                 "cleaning": "正在清理檔案...",
                 "cleaning_progress": "正在清理檔案 {}/{} ({:.1f}%)\n已清理 {}/{} 句字幕",
                 "cleaning_complete": "清理完成！共清理 {}/{} 句字幕\n開始翻譯...",
+                "cleaning_rules": "規則統計：{}",
+                "scanning_folder": "正在掃描資料夾…已加入 {} 個檔案",
                 "translating": "正在翻譯 {} 個檔案...",
                 "translation_progress": "正在翻譯第 {}/{} 句字幕 ({}%)",
+                "files_progress": "已完成 {}/{} 個檔案",
                 "all_complete": "所有檔案翻譯完成！",
                 "workspace_cleaned": "所有檔案翻譯完成！工作區已清理。",
                 "error": "錯誤",
@@ -69,10 +92,16 @@ class App(TkinterDnD.Tk if TKDND_AVAILABLE else tk.Tk):
                 "target_lang_label": "Target Language:",
                 "model_label": "Select Model:",
                 "parallel_label": "Parallel Requests:",
+                "parallel_files_label": "Parallel Files:",
+                "pack_size_label": "Cues per Request:",
                 "auto_clean": "Auto Clean Before Translation",
                 "debug_mode": "Debug Mode",
                 "clean_workspace": "Clean Workspace After Translation",
                 "replace_original": "Replace Original File",
+                "use_cache": "Use Translation Cache",
+                "adaptive_concurrency": "Adaptive Concurrency",
+                "native_api": "Native API (keep model loaded)",
+                "stats_line": "Requests {}/{} | Queued {} files | Latency p50 {} p95 {} | {:.0f} tokens/s | Cache hits {} | Retries {}",
                 "start_translation": "Start Translation",
                 "file_removed": "Selected file has been removed from workspace",
                 "no_files": "Warning",
@@ -82,8 +111,11 @@ class App(TkinterDnD.Tk if TKDND_AVAILABLE else tk.Tk):
                 "cleaning": "Cleaning files...",
                 "cleaning_progress": "Cleaning files {}/{} ({:.1f}%)\nCleaned {}/{} subtitles",
                 "cleaning_complete": "Cleaning complete! Cleaned {}/{} subtitles\nStarting translation...",
+                "cleaning_rules": "Rules: {}",
+                "scanning_folder": "Scanning folder... {} files added",
                 "translating": "Translating {} files...",
                 "translation_progress": "Translating subtitle {}/{} ({}%)",
+                "files_progress": "Completed {}/{} files",
                 "all_complete": "All files have been translated!",
                 "workspace_cleaned": "All files have been translated! Workspace has been cleaned.",
                 "error": "Error",
@@ -103,10 +135,8 @@ class App(TkinterDnD.Tk if TKDND_AVAILABLE else tk.Tk):
         self.title(self.get_text("window_title"))
         self.geometry("600x600")
 
-        # 只在有 tkinterdnd2 時啟用拖放功能
-        if TKDND_AVAILABLE:
-            self.drop_target_register(DND_FILES)
-            self.dnd_bind('<<Drop>>', self.handle_drop)
+        # 視窗顯示後才載入拖放功能
+        self.after_idle(self.enable_drag_and_drop)
 
         # 初始化變數
         self.clean_mode_var = tk.BooleanVar(value=False)
@@ -114,9 +144,26 @@ class App(TkinterDnD.Tk if TKDND_AVAILABLE else tk.Tk):
         self.auto_clean_workspace_var = tk.BooleanVar(value=True)
         self.replace_original_var = tk.BooleanVar(value=False)
         self.use_alt_prompt_var = tk.BooleanVar(value=False)  # Add this line
+        self.use_cache_var = tk.BooleanVar(value=True)
+        self.adaptive_concurrency_var = tk.BooleanVar(value=False)
+        self.native_api_var = tk.BooleanVar(value=get_backend().mode == "native")
+
+        # 工作執行緒的進度與訊息經由事件佇列交給主執行緒
+        self.ui_events = UIEventQueue()
+        self._ui_job = None
+        self._scheduler = None
+        self._translating = False
+        self._cleaning = False
+        self._scanning = False
+        self._scan_counts = None
+        self._loading_models = False
+        # 檔案清單的工作表：每個檔案只保存路徑、狀態與進度，檢查重複不必逐一讀取 Listbox
+        self.jobs = JobTable()
+        self._recent_messages = deque(maxlen=RECENT_MESSAGES)
 
         self.create_widgets()
         self.create_clean_menu()
+        self.load_model_list()
 
     def get_text(self, key):
         """獲取當前語言的文字"""
@@ -147,12 +194,17 @@ class App(TkinterDnD.Tk if TKDND_AVAILABLE else tk.Tk):
         self.target_lang_label.config(text=self.get_text("target_lang_label"))
         self.model_label.config(text=self.get_text("model_label"))
         self.parallel_label.config(text=self.get_text("parallel_label"))
+        self.parallel_files_label.config(text=self.get_text("parallel_files_label"))
+        self.pack_size_label.config(text=self.get_text("pack_size_label"))
         
         # 更新複選框文字
         self.clean_mode_check.config(text=self.get_text("auto_clean"))
         self.debug_mode_check.config(text=self.get_text("debug_mode"))
         self.auto_clean_workspace_check.config(text=self.get_text("clean_workspace"))
         self.replace_original_check.config(text=self.get_text("replace_original"))
+        self.use_cache_check.config(text=self.get_text("use_cache"))
+        self.adaptive_concurrency_check.config(text=self.get_text("adaptive_concurrency"))
+        self.native_api_check.config(text=self.get_text("native_api"))
 
         # 更新下拉選單選項
         current_source = self.source_lang.get()
@@ -265,8 +317,9 @@ class App(TkinterDnD.Tk if TKDND_AVAILABLE else tk.Tk):
         # 模型選擇標籤和選擇框
         self.model_label = ttk.Label(model_frame, text=self.get_text("model_label"))
         self.model_label.grid(row=0, column=0)
-        self.model_combo = ttk.Combobox(model_frame, values=self.get_model_list())
-        self.model_combo.set("huihui_ai/aya-expanse-abliterated:latest")
+        # 先顯示上次保存的模型清單，最新的清單在背景取得
+        self.model_combo = ttk.Combobox(model_frame, values=load_cached_models())
+        self.model_combo.set(DEFAULT_MODEL)
         self.model_combo.grid(row=0, column=1)
 
         # 並行請求數標籤和選擇框
@@ -276,6 +329,20 @@ class App(TkinterDnD.Tk if TKDND_AVAILABLE else tk.Tk):
         self.parallel_requests.set("10")
         self.parallel_requests.grid(row=0, column=3)
 
+        # 每次請求打包的字幕句數，1 表示逐句翻譯
+        self.pack_size_label = ttk.Label(model_frame, text=self.get_text("pack_size_label"))
+        self.pack_size_label.grid(row=1, column=0)
+        self.pack_size = ttk.Combobox(model_frame, values=["1", "2", "4", "8", "12", "16"])
+        self.pack_size.set("1")
+        self.pack_size.grid(row=1, column=1)
+
+        # 並行檔案數標籤和選擇框（所有檔案共用上方的請求數預算）
+        self.parallel_files_label = ttk.Label(model_frame, text=self.get_text("parallel_files_label"))
+        self.parallel_files_label.grid(row=1, column=2)
+        self.parallel_files = ttk.Combobox(model_frame, values=["1", "2", "3", "4", "5", "6", "8", "10"])
+        self.parallel_files.set(str(DEFAULT_MAX_FILES))
+        self.parallel_files.grid(row=1, column=3)
+
         # Checkbox 框架
         checkbox_frame = ttk.Frame(self)
         checkbox_frame.pack(pady=5)
@@ -324,6 +391,30 @@ class App(TkinterDnD.Tk if TKDND_AVAILABLE else tk.Tk):
         )
         self.use_alt_prompt_check.grid(row=2, column=0, padx=10, pady=2, sticky='w')
 
+        # 翻譯快取複選框
+        self.use_cache_check = ttk.Checkbutton(
+            checkbox_frame,
+            text=self.get_text("use_cache"),
+            variable=self.use_cache_var
+        )
+        self.use_cache_check.grid(row=2, column=1, padx=10, pady=2, sticky='w')
+
+        # 自適應並行數複選框（並行請求數作為上限）
+        self.adaptive_concurrency_check = ttk.Checkbutton(
+            checkbox_frame,
+            text=self.get_text("adaptive_concurrency"),
+            variable=self.adaptive_concurrency_var
+        )
+        self.adaptive_concurrency_check.grid(row=3, column=0, padx=10, pady=2, sticky='w')
+
+        # 原生 API 複選框（keep_alive 與預先載入模型）
+        self.native_api_check = ttk.Checkbutton(
+            checkbox_frame,
+            text=self.get_text("native_api"),
+            variable=self.native_api_var
+        )
+        self.native_api_check.grid(row=3, column=1, padx=10, pady=2, sticky='w')
+
         # 配置 grid 的列和行權重，使其能夠自適應
         checkbox_frame.grid_columnconfigure(0, weight=1)
         checkbox_frame.grid_columnconfigure(1, weight=1)
@@ -344,6 +435,11 @@ class App(TkinterDnD.Tk if TKDND_AVAILABLE else tk.Tk):
         self.progress_bar = ttk.Progressbar(progress_frame, length=400, mode='determinate')
         self.progress_bar.pack(fill=tk.X)
 
+        # 執行期統計面板
+        self.stats_label = ttk.Label(progress_frame, text="", foreground="gray")
+        self.stats_label.pack(fill=tk.X, pady=(5, 0))
+        self._stats_job = None
+
         # 狀態標籤框架
         status_frame = ttk.Frame(self)
         status_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 20))
@@ -352,90 +448,136 @@ class App(TkinterDnD.Tk if TKDND_AVAILABLE else tk.Tk):
         self.status_label = ttk.Label(status_frame, text="", wraplength=550, justify="center")
         self.status_label.pack(fill=tk.BOTH, expand=True)
 
-    def handle_drop(self, event):
+    def enable_drag_and_drop(self):
+        """載入 tkinterdnd2 並把整個視窗註冊為拖放目標；未安裝時停用拖放"""
+        try:
+            from tkinterdnd2 import TkinterDnD, DND_FILES
+            TkinterDnD._require(self)
+        except (ImportError, RuntimeError) as e:
+            print(f"警告：無法載入 tkinterdnd2（{str(e)}），拖放功能將被停用")
+            return
+        # 根視窗是一般的 tk.Tk，直接以 Tcl 指令註冊，%D 為拖放的檔案清單
+        self.tk.call('tkdnd::drop_target', 'register', self._w, (DND_FILES,))
+        self.tk.call('bind', self._w, '<<Drop>>', f"{self.register(self.handle_drop)} %D")
+
+    def handle_drop(self, data):
         """處理檔案拖放"""
-        files = self.tk.splitlist(event.data)
-        for file in files:
-            # 檢查是否為 .srt 檔案
-            if file.lower().endswith('.srt'):
-                # 在 Windows 上移除檔案路徑的大括號（如果有的話）
-                file = file.strip('{}')
-                self.file_list.insert(tk.END, file)
+        files = []
+        for file in self.tk.splitlist(data):
+            # 在 Windows 上移除檔案路徑的大括號（如果有的話）
+            file = file.strip('{}')
+            if os.path.isdir(file):
+                # 拖放資料夾時在背景掃描
+                self.start_folder_scan(file)
+            elif file.lower().endswith('.srt'):
+                files.append(file)
             else:
                 messagebox.showwarning("警告", f"檔案 {file} 不是 SRT 格式，已略過")
+        self.add_files(files)
 
     def select_files(self):
         files = filedialog.askopenfilenames(filetypes=[("SRT files", "*.srt")])
-        for file in files:
-            self.file_list.insert(tk.END, file)
+        self.add_files(files)
+
+    def add_files(self, paths):
+        """將不在清單中的檔案一次加入 Listbox，回傳 (加入數, 重複數)"""
+        batch = []
+        for path in paths:
+            record = self.jobs.add(path)
+            if record is not None:
+                batch.append(record.path)
+        if batch:
+            self.file_list.insert(tk.END, *batch)
+        return len(batch), len(paths) - len(batch)
+
+    def remove_file_indices(self, indices):
+        """從清單移除指定位置的檔案並更新工作表"""
+        for index in sorted(indices, reverse=True):
+            self.jobs.remove(self.file_list.get(index))
+            self.file_list.delete(index)
+
+    def _list_index(self, file_path):
+        """檔案在 Listbox 中的位置；完成的檔案多半在前面，分段取出搜尋，不必複製整個清單"""
+        size = self.file_list.size()
+        for first in range(0, size, LIST_SEARCH_CHUNK):
+            chunk = self.file_list.get(first, min(first + LIST_SEARCH_CHUNK, size) - 1)
+            if file_path in chunk:
+                return first + chunk.index(file_path)
+        return None
 
     def select_folder(self):
         """選擇文件夾並批量添加 SRT 檔案"""
         folder_path = filedialog.askdirectory(title="選擇包含 SRT 檔案的文件夾")
-        if not folder_path:
-            return
+        if folder_path:
+            self.start_folder_scan(folder_path)
 
-        # 計數器
-        added_count = 0
-        skipped_count = 0
-        backup_count = 0
-
-        # 遍歷文件夾中的所有檔案
-        for root, dirs, files in os.walk(folder_path):
-            # 跳過 backup 目錄
-            if 'backup' in dirs:
-                dirs.remove('backup')  # 這會讓 os.walk 跳過 backup 目錄
-            
-            # 檢查當前目錄是否為 backup 目錄
-            if os.path.basename(root) == 'backup':
-                backup_count += len([f for f in files if f.lower().endswith('.srt')])
-                continue
-                
-            for file in files:
-                if file.lower().endswith('.srt'):
-                    # 跳過中文翻譯檔案
-                    if file.lower().endswith('.zh_tw.srt'):
-                        skipped_count += 1
-                        continue
-                    
-                    full_path = os.path.join(root, file)
-                    
-                    # 檢查是否已在列表中
-                    already_exists = False
-                    for i in range(self.file_list.size()):
-                        if self.file_list.get(i) == full_path:
-                            already_exists = True
-                            skipped_count += 1
-                            break
-                    
-                    if not already_exists:
-                        self.file_list.insert(tk.END, full_path)
-                        added_count += 1
+    def start_folder_scan(self, folder_path):
+        """在背景執行緒掃描資料夾，結果分批經由事件佇列加入清單"""
+        if self._scanning:
+            messagebox.showwarning("提示", "正在掃描其他資料夾，請稍候")
+            return
+        # 包含／排除樣式取自 SRT_TRANSLATOR_INCLUDE / SRT_TRANSLATOR_EXCLUDE，並略過目標語言的輸出檔案
+        scan_filter = ScanFilter.for_target(get_language_suffix(self.target_lang.get()))
+        self._scanning = True
+        self._scan_counts = {"added": 0, "duplicates": 0}
+        self.status_label.config(text=self.get_text("scanning_folder").format(0))
+
+        def work():
+            stats = {}
+            error = None
+            try:
+                for batch in scan_folder(folder_path, scan_filter, stats=stats):
+                    self.ui_events.post("scan_batch", batch)
+            except Exception as e:
+                error = e
+            self.ui_events.post("scan_done", (stats, error))
+
+        threading.Thread(target=work, daemon=True).start()
+        self._ensure_ui_poller()
+
+    def folder_scan_finished(self, stats, error):
+        """資料夾掃描完成（主執行緒）"""
+        self._scanning = False
+        counts, self._scan_counts = self._scan_counts, None
+        if error is not None:
+            messagebox.showerror("錯誤", f"掃描資料夾時發生錯誤：{str(error)}")
+            return
 
         # 顯示結果
-        message = f"已添加 {added_count} 個 SRT 檔案"
-        if skipped_count > 0 or backup_count > 0:
-            message += f"\n已跳過 {skipped_count} 個檔案（包含已翻譯檔案或重複檔案）"
-            if backup_count > 0:
-                message += f"\n已跳過 {backup_count} 個備份目錄中的檔案"
-        
-        if added_count > 0:
+        message = f"已添加 {counts['added']} 個 SRT 檔案"
+        if counts["duplicates"]:
+            message += f"\n已跳過 {counts['duplicates']} 個已在清單中的檔案"
+        if stats.get("excluded"):
+            message += f"\n已跳過 {stats['excluded']} 個符合排除樣式的檔案（包含已翻譯檔案）"
+        if stats.get("excluded_dirs"):
+            message += f"\n已跳過 {stats['excluded_dirs']} 個排除的資料夾（例如 backup）"
+
+        if not self._translating and not self._cleaning:
+            self.status_label.config(text=message)
+        if counts["added"] > 0:
             messagebox.showinfo("完成", message)
         else:
             messagebox.showwarning("提示", "未找到可添加的 SRT 檔案")
 
-    def get_model_list(self):
-        import urllib.request
-        import json
-        url = "http://localhost:11434/v1/models"
-        try:
-            with urllib.request.urlopen(url) as response:
-                models = json.loads(response.read())
-                if 'data' in models and isinstance(models['data'], list):
-                    return [model['id'] for model in models['data']]
-        except Exception:
-            pass
-        return []
+    def load_model_list(self):
+        """在背景取得模型清單，不阻塞視窗開啟"""
+        def work():
+            try:
+                models = refresh_models()
+            except Exception as e:
+                print(f"無法取得模型清單: {str(e)}")
+                models = None
+            self.ui_events.post("models", models)
+
+        self._loading_models = True
+        threading.Thread(target=work, daemon=True).start()
+        self._ensure_ui_poller()
+
+    def model_list_loaded(self, models):
+        """更新模型選單（主執行緒）"""
+        self._loading_models = False
+        if models:
+            self.model_combo.configure(values=models)
 
     def start_translation(self):
         """開始翻譯"""
@@ -454,79 +596,238 @@ class App(TkinterDnD.Tk if TKDND_AVAILABLE else tk.Tk):
             ):
                 return
 
-        # 如果開啟了清理模式，先清理檔案
+        # 在背景預先載入模型，與清理檔案同時進行
+        backend = configure_backend("native" if self.native_api_var.get() else "openai")
+        backend.warm_up(self.model_combo.get())
+        self._recent_messages.clear()
+
+        # 如果開啟了清理模式，先在背景清理檔案，完成後才開始翻譯
         if self.clean_mode_var.get():
             self.status_label.config(text=self.get_text("cleaning"))
-            self.update_idletasks()
-            
-            total_cleaned = 0
-            total_subtitles = 0
-            
-            for i in range(self.file_list.size()):
-                input_file = self.file_list.get(i)
-                try:
-                    # 清理檔案並獲取結果
-                    result = clean_srt_file(input_file, self.replace_original_var.get())
-                    
-                    total_cleaned += result["cleaned"]
-                    total_subtitles += result["total"]
-                    
-                    # 更新進度
-                    progress = (i + 1) / self.file_list.size() * 100
-                    self.progress_bar['value'] = progress
-                    self.status_label.config(
-                        text=self.get_text("cleaning_progress").format(
-                            i+1,
-                            self.file_list.size(),
-                            progress,
-                            total_cleaned,
-                            total_subtitles
-                        )
-                    )
-                    self.update_idletasks()
-                    
-                except Exception as e:
-                    messagebox.showerror(
-                        self.get_text("error"),
-                        str(e)
-                    )
-                    return
-
-            self.status_label.config(
-                text=self.get_text("cleaning_complete").format(
-                    total_cleaned,
-                    total_subtitles
-                )
+            self.translate_button.config(state=tk.DISABLED)
+            self.start_cleaning(
+                self.file_list.get(0, tk.END), self.replace_original_var.get(), self._translate_after_cleaning
             )
-            self.update_idletasks()
+            return
+
+        self.dispatch_translation()
+
+    def _translate_after_cleaning(self, summary, errors):
+        """清理完成後開始翻譯（主執行緒）"""
+        self.translate_button.config(state=tk.NORMAL)
+        if errors:
+            messagebox.showerror(self.get_text("error"), "\n".join(str(e) for e in errors))
+            return
+        self._recent_messages.append(self.get_text("cleaning_rules").format(
+            format_rule_stats(summary.get("rules", {})) or "-"
+        ))
+        self.status_label.config(
+            text=self.get_text("cleaning_complete").format(summary.get("cleaned", 0), summary.get("total", 0))
+        )
+        self.dispatch_translation()
 
+    def dispatch_translation(self):
+        """設定排程器並將檔案排入翻譯佇列"""
         # 重置進度條
         self.progress_bar['value'] = 0
-        total_files = self.file_list.size()
-        
-        # 開始翻譯
-        for i in range(total_files):
-            file_path = self.file_list.get(i)
+
+        # 設定全域排程器：檔案數與請求數上限
+        scheduler = get_scheduler()
+        scheduler.configure(
+            max_files=self.parallel_files.get(),
+            max_requests=self.parallel_requests.get(),
+            adaptive=self.adaptive_concurrency_var.get()
+        )
+        from src.translation.endpoint_pool import get_client
+        from src.translation.metrics import get_metrics
+
+        # keep-alive 連線池大小與請求預算一致
+        get_client().resize(scheduler.max_requests)
+        get_metrics().bind_scheduler(scheduler)
+
+        # 開始翻譯，檔案依序排入佇列；翻譯執行緒只透過事件佇列回報，不直接操作 Tk 元件
+        self._scheduler = scheduler
+        if scheduler.pending == 0:
+            self.ui_events.clear_progress()
+            self.jobs.reset_run()
+        get_profiler().reset()
+        # 佇列中只放精簡的工作，翻譯執行緒在檔案開始處理時才建立
+        factory = self._make_thread_factory(scheduler)
+        submitted = 0
+        with get_profiler().span("dispatch"):
+            for file_path in self.file_list.get(0, tk.END):
+                record = self.jobs.get(file_path)
+                if record is not None and self.jobs.queue(record):
+                    scheduler.submit(LazyJob(record.path, factory))
+                    submitted += 1
+
+        self.status_label.config(
+            text=self.get_text("translating").format(submitted)
+        )
+        self._translating = True
+        self.refresh_stats()
+        self._ensure_ui_poller()
+
+    def _make_thread_factory(self, scheduler):
+        """記下目前的設定（Tk 變數只能在主執行緒讀取），回傳以路徑建立翻譯執行緒的函式"""
+        from src.translation.translation_thread import TranslationThread
+
+        settings = (
+            self.source_lang.get(),
+            self.target_lang.get(),
+            self.model_combo.get(),
+            self.parallel_requests.get(),
+            self.debug_mode_var.get(),
+            self.replace_original_var.get(),
+            self.use_cache_var.get(),
+            int(self.pack_size.get())
+        )
+
+        def create(file_path):
+            source, target, model, parallel, debug, replace, use_cache, pack_size = settings
             thread = TranslationThread(
-                file_path, 
-                self.source_lang.get(), 
-                self.target_lang.get(), 
-                self.model_combo.get(),
-                self.parallel_requests.get(),
-                self.update_progress,
-                self.file_translated,
-                self.debug_mode_var.get(),
-                self.replace_original_var.get()
+                file_path,
+                source,
+                target,
+                model,
+                parallel,
+                self._make_progress_callback(file_path),
+                self._make_complete_callback(file_path),
+                debug,
+                replace,
+                scheduler=scheduler,
+                use_cache=use_cache,
+                pack_size=pack_size
             )
             thread.set_app(self)
-            thread.start()
+            return thread
 
+        return create
+
+    def _ensure_ui_poller(self):
+        if self._ui_job is None:
+            self._ui_job = self.after(UI_FRAME_MS, self.poll_ui_events)
+
+    def start_cleaning(self, paths, create_backup, on_done):
+        """在背景執行緒以行程池清理檔案，進度經由事件佇列回報；on_done(總計, 錯誤清單) 在主執行緒執行"""
+        paths = list(paths)
+        self._cleaning = True
+        self.progress_bar['value'] = 0
+
+        def work():
+            summary = {}
+            errors = []
+            with get_profiler().span("clean"):
+                for done, (path, result, error) in enumerate(clean_files(paths, create_backup), 1):
+                    if error is not None:
+                        errors.append(error)
+                    else:
+                        merge_stats(summary, result)
+                    self.ui_events.post("clean_progress", (done, len(paths), dict(summary)))
+            self.ui_events.post("clean_done", (summary, errors, on_done))
+
+        threading.Thread(target=work, daemon=True).start()
+        self._ensure_ui_poller()
+
+    def show_cleaning_progress(self, done, total_files, summary):
+        progress = done / total_files * 100
+        self.progress_bar['value'] = progress
         self.status_label.config(
-            text=self.get_text("translating").format(total_files)
+            text=self.get_text("cleaning_progress").format(
+                done, total_files, progress, summary.get("cleaned", 0), summary.get("total", 0)
+            )
         )
 
+    def _make_progress_callback(self, file_path):
+        """翻譯執行緒使用的進度回調（在工作執行緒執行）"""
+        def progress(current, total, extra_data=None):
+            if extra_data:
+                self.ui_events.post(extra_data.get("type"), extra_data)
+            else:
+                self.ui_events.post_progress(file_path, current, total)
+        return progress
+
+    def _make_complete_callback(self, file_path):
+        """翻譯執行緒使用的完成回調（在工作執行緒執行）"""
+        def complete(message):
+            self.ui_events.post("file_message", (file_path, message))
+        return complete
+
+    def poll_ui_events(self):
+        """在主執行緒處理工作執行緒的事件，每一幀最多重繪一次進度"""
+        self._ui_job = None
+        # 先確認是否全部完成再取出事件，確保最後的事件不會遺漏
+        finished = self._translating and self._scheduler.pending == 0
+        events, progress = self.ui_events.drain()
+        # 先套用進度，完成訊息之後的最終進度才不會遺漏
+        for file_path, (current, total) in progress.items():
+            self.jobs.update(file_path, current, total)
+        cleaning_progress = None
+        for kind, payload in events:
+            if kind == "file_conflict":
+                self.update_progress(-1, -1, payload)
+            elif kind == "file_message":
+                self.file_translated(*payload)
+            elif kind == "clean_progress":
+                # 同一幀內只顯示最新的清理進度
+                cleaning_progress = payload
+            elif kind == "clean_done":
+                summary, errors, on_done = payload
+                self._cleaning = False
+                cleaning_progress = None
+                on_done(summary, errors)
+            elif kind == "scan_batch":
+                added, duplicates = self.add_files(payload)
+                self._scan_counts["added"] += added
+                self._scan_counts["duplicates"] += duplicates
+                if not self._translating and not self._cleaning:
+                    self.status_label.config(
+                        text=self.get_text("scanning_folder").format(self._scan_counts["added"])
+                    )
+            elif kind == "scan_done":
+                self.folder_scan_finished(*payload)
+            elif kind == "models":
+                self.model_list_loaded(payload)
+        with get_profiler().span("tk_update"):
+            if cleaning_progress is not None:
+                self.show_cleaning_progress(*cleaning_progress)
+            elif self._translating and (events or progress):
+                self.show_total_progress()
+        if finished:
+            self._translating = False
+            self.translation_finished()
+        if self._translating or self._cleaning or self._scanning or self._loading_models:
+            self._ensure_ui_poller()
+
+    def refresh_stats(self):
+        """定期更新統計面板，所有檔案完成後停止"""
+        if self._stats_job is not None:
+            self.after_cancel(self._stats_job)
+            self._stats_job = None
+        from src.translation.metrics import get_metrics
+
+        data = get_metrics().snapshot()
+        counters = data["counters"]
+        latency = data["latency"]
+
+        def seconds(value):
+            return f"{value:.2f}s" if value is not None else "-"
+
+        self.stats_label.config(text=self.get_text("stats_line").format(
+            data.get("in_flight", 0),
+            data.get("concurrency_limit", 0),
+            data.get("queued_files", 0),
+            seconds(latency["p50"]),
+            seconds(latency["p95"]),
+            data["completion_tokens_per_sec"],
+            counters["cache_hits"],
+            counters["retries"]
+        ))
+        if self._scheduler is not None and self._scheduler.pending:
+            self._stats_job = self.after(STATS_REFRESH_MS, self.refresh_stats)
+
     def update_progress(self, current, total, extra_data=None):
-        """更新進度"""
+        """更新進度（主執行緒）"""
         if extra_data and extra_data.get("type") == "file_conflict":
             # 在主線程中顯示對話框
             result = self.show_countdown_dialog(
@@ -539,48 +840,53 @@ class App(TkinterDnD.Tk if TKDND_AVAILABLE else tk.Tk):
             return
             
         # 正常的進度更新
-        if current >= 0 and total >= 0:
-            percentage = int(current / total * 100)
-            self.progress_bar['value'] = percentage
-            self.status_label.config(
-                text=self.get_text("translation_progress").format(
-                    current,
-                    total,
-                    percentage
-                )
-            )
-            self.update_idletasks()
-
-    def file_translated(self, message):
-        """處理檔案翻譯完成的回調"""
-        current_text = self.status_label.cget("text")
-        self.status_label.config(text=f"{current_text}\n{message}")
+        if current >= 0 and total > 0:
+            self.render_progress(current, total, int(current / total * 100))
+
+    def render_progress(self, current, total, percentage):
+        """更新進度條與狀態文字"""
+        self.progress_bar['value'] = percentage
+        lines = [self.get_text("translation_progress").format(current, total, percentage)]
+        if self.jobs.run_files > 1:
+            lines.append(self.get_text("files_progress").format(
+                self.jobs.finished_files, self.jobs.run_files
+            ))
+        lines.extend(self._recent_messages)
+        self.status_label.config(text="\n".join(lines))
+
+    def show_total_progress(self):
+        """彙總所有檔案的進度：字幕數為已開始的檔案合計，百分比以檔案平均；
+        工作表逐筆累計，不必走訪所有檔案"""
+        self.render_progress(self.jobs.done_cues, self.jobs.total_cues, self.jobs.percent)
+
+    def file_translated(self, file_path, message):
+        """處理檔案翻譯完成的訊息（主執行緒）"""
+        self._recent_messages.append(message)
         
-        # 檢查是否所有檔案都已翻譯完成
-        if "翻譯完成" in message:
-            # 從檔案列表中移除已翻譯的檔案
-            if self.auto_clean_workspace_var.get():
-                for i in range(self.file_list.size()):
-                    if os.path.basename(self.file_list.get(i)) in message:
-                        self.file_list.delete(i)
-                        break
-            
-            # 如果檔案列表為空且啟用了自動清理，顯示完成訊息
-            if self.file_list.size() == 0 and self.auto_clean_workspace_var.get():
-                self.status_label.config(text=self.get_text("workspace_cleaned"))
-                self.progress_bar['value'] = 0
-                messagebox.showinfo(
-                    self.get_text("confirm"),
-                    self.get_text("workspace_cleaned")
-                )
-            # 如果檔案列表不為空或未啟用自動清理，只顯示翻譯完成訊息
-            elif not self.auto_clean_workspace_var.get():
-                self.status_label.config(text=self.get_text("all_complete"))
-                self.progress_bar['value'] = 0
-                messagebox.showinfo(
-                    self.get_text("confirm"),
-                    self.get_text("all_complete")
-                )
+        if "翻譯完成" in message or "已跳過檔案" in message:
+            self.jobs.finish(file_path)
+
+        # 從檔案列表中移除已翻譯的檔案
+        if "翻譯完成" in message and self.auto_clean_workspace_var.get():
+            index = self._list_index(file_path)
+            if index is not None:
+                self.remove_file_indices([index])
+
+    def translation_finished(self):
+        """所有檔案完成後顯示完成訊息"""
+        self.refresh_stats()
+        self.progress_bar['value'] = 0
+        # 如果檔案列表為空且啟用了自動清理，顯示清理完成訊息
+        if self.file_list.size() == 0 and self.auto_clean_workspace_var.get():
+            message = self.get_text("workspace_cleaned")
+        else:
+            message = self.get_text("all_complete")
+        self.status_label.config(text="\n".join([message] + list(self._recent_messages)))
+        # 啟用效能剖析時寫出報告
+        report_path = get_profiler().write_report()
+        if report_path:
+            print(f"效能剖析報告已保存至 {os.path.dirname(report_path)}")
+        messagebox.showinfo(self.get_text("confirm"), message)
 
     def show_context_menu(self, event):
         """顯示右鍵選單"""
@@ -599,7 +905,7 @@ class App(TkinterDnD.Tk if TKDND_AVAILABLE else tk.Tk):
         try:
             selected = self.file_list.curselection()
             if selected:
-                self.file_list.delete(selected)
+                self.remove_file_indices(selected)
         except Exception as e:
             messagebox.showerror("錯誤", f"除檔案時發生錯誤：{str(e)}")
 
@@ -652,43 +958,31 @@ class App(TkinterDnD.Tk if TKDND_AVAILABLE else tk.Tk):
             self.status_label.config(text="已關閉翻譯前自動清理功能")
 
     def clean_srt_files(self):
-        """清理選中的 SRT 檔案"""
+        """清理選中的 SRT 檔案（在背景執行，不會凍結視窗）"""
         if self.file_list.size() == 0:
             messagebox.showwarning("提示", "請先選擇要清理的 SRT 檔案")
             return
-            
-        # 創建備份目錄
-        backup_path = os.path.join(os.path.dirname(self.file_list.get(0)), 'backup')
-        ensure_backup_dir(backup_path)
+        if self._cleaning:
+            return
 
         # 更新狀態標籤
         self.status_label.config(text="正在清理檔案...")
-        self.update_idletasks()
-
-        total_cleaned = 0
-        total_files = self.file_list.size()
+        self.start_cleaning(self.file_list.get(0, tk.END), True, self._cleaning_finished)
 
-        for i in range(total_files):
-            input_file = self.file_list.get(i)
-            try:
-                # 清理檔案並獲取結果
-                result = clean_srt_file(input_file, create_backup=True)
-                total_cleaned += result["cleaned"]
-                    
-                # 更新進度
-                progress = (i + 1) / self.file_list.size() * 100
-                self.progress_bar['value'] = progress
-                self.status_label.config(text=f"正在清理檔案 {i+1}/{self.file_list.size()} ({progress:.1f}%)")
-                self.update_idletasks()
-                
-            except Exception as e:
-                messagebox.showerror("錯誤", f"處理檔案時發生錯誤: {str(e)}")
-                return
-
-        # 完成後重置進度條和狀態
+    def _cleaning_finished(self, summary, errors):
+        """清理完成（主執行緒）"""
         self.progress_bar['value'] = 0
-        self.status_label.config(text="清理完成！")
-        messagebox.showinfo("完成", "所有選中的 SRT 檔案已清理完成！\n原始檔案已備份至 backup 資料夾。")
+        if errors:
+            self.status_label.config(text="清理失敗")
+            messagebox.showerror("錯誤", "\n".join(str(e) for e in errors))
+            return
+        rules = format_rule_stats(summary.get("rules", {})) or "-"
+        self.status_label.config(text=f"清理完成！\n{self.get_text('cleaning_rules').format(rules)}")
+        messagebox.showinfo(
+            "完成",
+            f"所有選中的 SRT 檔案已清理完成！\n原始檔案已備份至 backup 資料夾。\n"
+            f"保留 {summary.get('cleaned', 0)}/{summary.get('total', 0)} 句字幕（{rules}）"
+        )
 
     def show_countdown_dialog(self, message, countdown=5):
         """顯示帶有倒計時的對話框"""
@@ -783,7 +1077,7 @@ class App(TkinterDnD.Tk if TKDND_AVAILABLE else tk.Tk):
         try:
             selected = self.file_list.curselection()
             if selected:
-                self.file_list.delete(selected)
+                self.remove_file_indices(selected)
                 self.status_label.config(text=self.get_text("file_removed"))
         except Exception as e:
             messagebox.showerror(
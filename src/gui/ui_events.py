@@ -0,0 +1,44 @@
+"""
+工作執行緒與 Tk 主執行緒之間的事件佇列。
+翻譯執行緒只把事件放進佇列，不直接操作 Tk 元件；
+主執行緒以 after() 定期取出事件並更新畫面。
+進度更新會合併：每個檔案只保留上一幀之後的最新進度，每一幀最多重繪一次；
+累計進度由主執行緒的工作表保存，佇列本身不隨檔案數增長。
+"""
+import threading
+from queue import Queue, Empty
+
+
+class UIEventQueue:
+    """執行緒安全的 UI 事件佇列"""
+
+    def __init__(self):
+        self._events = Queue()
+        self._lock = threading.Lock()
+        # 上次取出之後有變動的進度
+        self._progress = {}
+
+    def post(self, kind, payload=None):
+        """加入一個必須逐一處理的事件（例如檔案完成、衝突對話框）"""
+        self._events.put((kind, payload))
+
+    def post_progress(self, key, current, total):
+        """更新某個檔案的進度，只保留最新值"""
+        with self._lock:
+            self._progress[key] = (current, total)
+
+    def drain(self):
+        """取出所有待處理事件，回傳 (事件清單, 有變動的進度 {key: (current, total)})"""
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except Empty:
+                break
+        with self._lock:
+            progress, self._progress = self._progress, {}
+        return events, progress
+
+    def clear_progress(self):
+        with self._lock:
+            self._progress.clear()
@@ -0,0 +1,155 @@
+"""
+對話 API 的格式。
+預設使用 OpenAI 相容的 /v1/chat/completions；
+原生模式使用 Ollama 的 /api/chat，可明確設定 keep_alive、num_ctx 與 num_predict，
+並在送出翻譯前預先載入模型。
+系統提示詞固定放在第一則訊息，所有請求的前綴相同，伺服器可重用已計算的提示詞快取。
+"""
+import os
+import threading
+
+
+# openai 或 native
+API_ENV = 'OLLAMA_API'
+API_MODES = ('openai', 'native')
+# 模型在最後一次請求後保持載入的時間
+DEFAULT_KEEP_ALIVE = "30m"
+# 預先載入模型的逾時秒數（大型模型載入可能很久）
+PRELOAD_TIMEOUT = 300.0
+TEMPERATURE = 0.1  # 降低溫度以獲得更穩定的輸出
+
+
+class OpenAIChatBackend:
+    """OpenAI 相容格式，模型的載入與卸載由 Ollama 預設值決定"""
+
+    mode = 'openai'
+    chat_path = "/v1/chat/completions"
+
+    def build_payload(self, model, system_prompt, user_content):
+        return {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_content}
+            ],
+            "stream": False,
+            "temperature": TEMPERATURE
+        }
+
+    def parse_reply(self, result):
+        """回傳 (譯文, usage)"""
+        return result['choices'][0]['message']['content'].strip(), result.get('usage')
+
+    def warm_up(self, model):
+        """OpenAI 相容格式無法指定 keep_alive，不預先載入"""
+
+    def wait_ready(self, model):
+        pass
+
+
+class NativeChatBackend:
+    """Ollama 原生 /api/chat 格式"""
+
+    mode = 'native'
+    chat_path = "/api/chat"
+
+    def __init__(self, keep_alive=DEFAULT_KEEP_ALIVE, num_ctx=None, num_predict=None):
+        self.keep_alive = keep_alive
+        # num_ctx 必須在所有請求中保持一致，否則 Ollama 會重新載入模型
+        self.num_ctx = num_ctx
+        self.num_predict = num_predict
+        self._lock = threading.Lock()
+        self._warm_ups = {}
+
+    def _options(self):
+        options = {"temperature": TEMPERATURE}
+        if self.num_ctx:
+            options["num_ctx"] = int(self.num_ctx)
+        if self.num_predict:
+            options["num_predict"] = int(self.num_predict)
+        return options
+
+    def build_payload(self, model, system_prompt, user_content):
+        return {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_content}
+            ],
+            "stream": False,
+            "keep_alive": self.keep_alive,
+            "options": self._options()
+        }
+
+    def parse_reply(self, result):
+        """回傳 (譯文, usage)，token 數換算成 OpenAI 的 usage 欄位"""
+        usage = {
+            "prompt_tokens": result.get("prompt_eval_count") or 0,
+            "completion_tokens": result.get("eval_count") or 0
+        }
+        return result['message']['content'].strip(), usage
+
+    def warm_up(self, model):
+        """在背景預先載入模型到每台主機，重複呼叫時只載入一次"""
+        with self._lock:
+            if model in self._warm_ups:
+                return
+            done = threading.Event()
+            self._warm_ups[model] = done
+        threading.Thread(target=self._preload, args=(model, done), daemon=True).start()
+
+    def _preload(self, model, done):
+        # 沒有訊息的請求只會載入模型；options 與翻譯請求相同，避免之後重新載入
+        from src.translation.endpoint_pool import get_client
+
+        payload = {"model": model, "messages": [], "keep_alive": self.keep_alive, "options": self._options()}
+        try:
+            for endpoint in get_client().endpoints:
+                try:
+                    endpoint.client.post_json(self.chat_path, payload, timeout=PRELOAD_TIMEOUT)
+                except Exception as e:
+                    print(f"預先載入模型失敗（{endpoint.base_url}）: {str(e)}")
+        finally:
+            done.set()
+
+    def wait_ready(self, model):
+        """等待預先載入完成，避免所有請求同時等待冷啟動"""
+        with self._lock:
+            done = self._warm_ups.get(model)
+        if done is not None:
+            done.wait(PRELOAD_TIMEOUT)
+
+
+def create_backend(mode=None, keep_alive=DEFAULT_KEEP_ALIVE, num_ctx=None, num_predict=None):
+    """依模式建立對話格式，mode 預設取自 OLLAMA_API"""
+    mode = (mode or os.environ.get(API_ENV) or 'openai').lower()
+    if mode not in API_MODES:
+        raise ValueError(f"未知的 API 模式: {mode}")
+    if mode == 'native':
+        return NativeChatBackend(keep_alive, num_ctx, num_predict)
+    return OpenAIChatBackend()
+
+
+_default_backend = None
+_default_lock = threading.Lock()
+
+
+def configure_backend(mode=None, keep_alive=DEFAULT_KEEP_ALIVE, num_ctx=None, num_predict=None):
+    """設定共用的對話格式"""
+    global _default_backend
+    with _default_lock:
+        _default_backend = create_backend(mode, keep_alive, num_ctx, num_predict)
+        return _default_backend
+
+
+def get_backend():
+    """取得共用的對話格式"""
+    global _default_backend
+    with _default_lock:
+        if _default_backend is None:
+            try:
+                _default_backend = create_backend()
+            except ValueError as e:
+                print(f"警告：{str(e)}，改用 OpenAI 相容格式")
+                _default_backend = OpenAIChatBackend()
+        return _default_backend
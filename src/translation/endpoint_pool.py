@@ -0,0 +1,214 @@
+"""
+多台 Ollama 主機的負載平衡。
+以「預估完成時間最短」（進行中請求數 × 平均延遲）挑選主機，定期檢查故障主機，
+主機斷線時進行中的請求會改送到其他主機。
+連續回應 5xx 或逾時的主機會降低優先順序，達到上限後暫時停用，由健康檢查恢復。
+"""
+import http.client
+import os
+import threading
+import time
+
+from src.translation.ollama_client import OllamaClient, OllamaHTTPError, DEFAULT_BASE_URL, DEFAULT_POOL_SIZE
+
+# 以逗號分隔的主機清單，例如 http://gpu1:11434,http://gpu2:11434
+HOSTS_ENV = 'OLLAMA_HOSTS'
+DEFAULT_HEALTH_INTERVAL = 10.0
+HEALTH_CHECK_PATH = "/v1/models"
+HEALTH_CHECK_TIMEOUT = 3.0
+# 平均延遲的平滑係數
+EWMA_ALPHA = 0.2
+# 連續失敗（5xx 或逾時）達此次數的主機暫時停用
+MAX_CONSECUTIVE_FAILURES = 3
+
+
+class NoEndpointAvailableError(ConnectionError):
+    """所有主機都無法使用"""
+
+
+class Endpoint:
+    """單一主機與其統計資料"""
+
+    def __init__(self, base_url, pool_size=DEFAULT_POOL_SIZE):
+        self.base_url = base_url.rstrip('/')
+        self.client = OllamaClient(self.base_url, pool_size)
+        self.healthy = True
+        self.outstanding = 0
+        self.completed = 0
+        self.failures = 0
+        # 上次成功之後的連續失敗次數
+        self.consecutive_failures = 0
+        self.avg_latency = None
+
+    def expected_cost(self, default_latency):
+        """再送一個請求時預估的完成時間，延遲越低（吞吐量越高）的主機分到越多請求；
+        快速回應錯誤的主機延遲看似很低，依連續失敗次數加重成本"""
+        latency = self.avg_latency if self.avg_latency is not None else default_latency
+        return (self.outstanding + 1) * latency * (1 + self.consecutive_failures)
+
+    def stats(self):
+        return {
+            "url": self.base_url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "completed": self.completed,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "avg_latency": self.avg_latency
+        }
+
+
+class EndpointPool:
+    """在多台主機間分配請求，介面與 OllamaClient 相同"""
+
+    def __init__(self, base_urls, pool_size=DEFAULT_POOL_SIZE, health_interval=DEFAULT_HEALTH_INTERVAL):
+        self.endpoints = [Endpoint(url, pool_size) for url in base_urls]
+        self.health_interval = health_interval
+        self._lock = threading.Lock()
+        self._health_thread = None
+
+    def resize(self, pool_size):
+        """每台主機的連線池大小都與請求預算一致"""
+        for endpoint in self.endpoints:
+            endpoint.client.resize(pool_size)
+
+    def close(self):
+        for endpoint in self.endpoints:
+            endpoint.client.close()
+
+    def get_json(self, path, timeout=None):
+        return self.request('GET', path, timeout=timeout)
+
+    def post_json(self, path, payload, timeout=None):
+        return self.request('POST', path, payload, timeout=timeout)
+
+    def request(self, method, path, payload=None, timeout=None):
+        """送到目前最適合的主機，主機斷線、5xx 或 4xx（例如某台主機沒有該模型）時改送其他主機"""
+        tried = set()
+        last_error = None
+        client_error = None
+        while True:
+            endpoint = self._acquire(tried)
+            if endpoint is None:
+                # 所有主機都失敗時優先回報 4xx，例如找不到模型
+                raise client_error or last_error or NoEndpointAvailableError("沒有可用的 Ollama 主機")
+            tried.add(endpoint)
+            start = time.monotonic()
+            try:
+                result = endpoint.client.request(method, path, payload, timeout)
+            except OllamaHTTPError as e:
+                self._release(endpoint, None, failed=e.status >= 500)
+                if e.status < 500:
+                    client_error = client_error or e
+                else:
+                    last_error = e
+                continue
+            except TimeoutError as e:
+                # 逾時可能只是主機忙碌，不標記為故障
+                self._release(endpoint, None, failed=True)
+                last_error = e
+                continue
+            except (OSError, http.client.HTTPException) as e:
+                self._release(endpoint, None, failed=True, down=True)
+                last_error = e
+                continue
+            except BaseException:
+                self._release(endpoint, None, failed=False)
+                raise
+            self._release(endpoint, time.monotonic() - start, failed=False)
+            return result
+
+    def _acquire(self, exclude):
+        """挑選預估完成時間最短的健康主機；全部故障時仍嘗試尚未試過的主機"""
+        with self._lock:
+            candidates = [e for e in self.endpoints if e not in exclude]
+            healthy = [e for e in candidates if e.healthy]
+            if healthy:
+                candidates = healthy
+            if not candidates:
+                return None
+            known = [e.avg_latency for e in self.endpoints if e.avg_latency is not None]
+            default_latency = sum(known) / len(known) if known else 1.0
+            endpoint = min(candidates, key=lambda e: e.expected_cost(default_latency))
+            endpoint.outstanding += 1
+            return endpoint
+
+    def _release(self, endpoint, latency, failed, down=False):
+        with self._lock:
+            endpoint.outstanding -= 1
+            if failed:
+                endpoint.failures += 1
+                endpoint.consecutive_failures += 1
+                if endpoint.consecutive_failures >= MAX_CONSECUTIVE_FAILURES and endpoint.healthy:
+                    # 持續回應錯誤的主機暫時停用，避免每個請求都先送到它再改送
+                    down = True
+            if down:
+                endpoint.healthy = False
+            if latency is not None:
+                endpoint.healthy = True
+                endpoint.consecutive_failures = 0
+                endpoint.completed += 1
+                if endpoint.avg_latency is None:
+                    endpoint.avg_latency = latency
+                else:
+                    endpoint.avg_latency += EWMA_ALPHA * (latency - endpoint.avg_latency)
+        if down:
+            self._ensure_health_checker()
+
+    def _ensure_health_checker(self):
+        with self._lock:
+            if self._health_thread is None or not self._health_thread.is_alive():
+                self._health_thread = threading.Thread(target=self._health_loop, daemon=True)
+                self._health_thread.start()
+
+    def _health_loop(self):
+        """定期檢查故障主機，恢復後重新加入；所有主機恢復後結束"""
+        while True:
+            time.sleep(self.health_interval)
+            with self._lock:
+                down = [e for e in self.endpoints if not e.healthy]
+            if not down:
+                return
+            for endpoint in down:
+                try:
+                    endpoint.client.get_json(HEALTH_CHECK_PATH, timeout=HEALTH_CHECK_TIMEOUT)
+                except Exception:
+                    continue
+                with self._lock:
+                    endpoint.healthy = True
+                    # 健康檢查只代表主機可連線，再失敗一次就重新停用
+                    endpoint.consecutive_failures = min(endpoint.consecutive_failures, MAX_CONSECUTIVE_FAILURES - 1)
+
+    def stats(self):
+        """各主機的統計資料"""
+        with self._lock:
+            return [endpoint.stats() for endpoint in self.endpoints]
+
+
+def parse_hosts(value):
+    """解析以逗號分隔的主機清單"""
+    hosts = [host.strip() for host in (value or '').split(',') if host.strip()]
+    return [host if '://' in host else f"http://{host}" for host in hosts]
+
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+
+def configure_endpoints(base_urls):
+    """設定共用的主機清單"""
+    global _default_pool
+    with _default_lock:
+        if _default_pool is not None:
+            _default_pool.close()
+        _default_pool = EndpointPool(base_urls or [DEFAULT_BASE_URL])
+        return _default_pool
+
+
+def get_client():
+    """取得所有檔案共用的 Ollama 客戶端（主機清單預設取自 OLLAMA_HOSTS）"""
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = EndpointPool(parse_hosts(os.environ.get(HOSTS_ENV)) or [DEFAULT_BASE_URL])
+        return _default_pool
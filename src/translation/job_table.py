@@ -0,0 +1,124 @@
+"""
+檔案工作表。
+每個檔案只保存一筆精簡的紀錄（intern 過的路徑、狀態與進度），
+翻譯執行緒等大型物件在檔案開始處理時才建立、完成後即釋放，
+因此排入數萬個檔案時記憶體用量幾乎不隨佇列長度增加。
+整體進度以累計值逐筆更新，重繪時不必走訪所有檔案。
+"""
+import os
+import sys
+
+# 檔案狀態
+LISTED = 0     # 在清單中，尚未排入翻譯
+QUEUED = 1     # 已排入排程器
+FINISHED = 2   # 翻譯完成或已跳過
+
+
+def path_key(path):
+    """比對重複檔案用的路徑鍵"""
+    return os.path.normcase(os.path.abspath(path))
+
+
+class JobRecord:
+    """一個檔案的狀態與進度（已完成句數／總句數）"""
+    __slots__ = ('path', 'status', 'done', 'total')
+
+    def __init__(self, path):
+        self.path = path
+        self.status = LISTED
+        self.done = 0
+        self.total = 0
+
+    @property
+    def fraction(self):
+        if self.status == FINISHED:
+            return 1.0
+        return min(self.done / self.total, 1.0) if self.total > 0 else 0.0
+
+
+class JobTable:
+    """清單中所有檔案的紀錄，以及本輪翻譯的累計進度"""
+
+    def __init__(self):
+        self._records = {}
+        self.reset_run()
+
+    def reset_run(self):
+        """開始新的一輪翻譯：歸零累計值，清單中的檔案都可再次排入"""
+        for record in self._records.values():
+            record.status = LISTED
+        self.run_files = 0
+        self.finished_files = 0
+        self.done_cues = 0
+        self.total_cues = 0
+        self._fraction_sum = 0.0
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, path):
+        return path_key(path) in self._records
+
+    def get(self, path):
+        return self._records.get(path_key(path))
+
+    def add(self, path):
+        """加入檔案，已在清單中時回傳 None"""
+        key = sys.intern(path_key(path))
+        if key in self._records:
+            return None
+        # 路徑與鍵相同時（POSIX 的絕對路徑）共用同一個字串
+        record = JobRecord(key if key == path else sys.intern(path))
+        self._records[key] = record
+        return record
+
+    def remove(self, path):
+        """從清單移除；已計入本輪的進度不受影響"""
+        return self._records.pop(path_key(path), None)
+
+    def queue(self, record):
+        """把紀錄計入本輪翻譯，已排入或完成的檔案回傳 False"""
+        if record.status != LISTED:
+            return False
+        record.status = QUEUED
+        record.done = record.total = 0
+        self.run_files += 1
+        return True
+
+    def update(self, path, done, total):
+        """更新一個檔案的進度"""
+        record = self.get(path)
+        if record is None or record.status != QUEUED or total <= 0 or done < 0:
+            return
+        before = record.fraction
+        self.done_cues += done - record.done
+        self.total_cues += total - record.total
+        record.done = done
+        record.total = total
+        self._fraction_sum += record.fraction - before
+
+    def finish(self, path):
+        """檔案翻譯完成或已跳過"""
+        record = self.get(path)
+        if record is None or record.status != QUEUED:
+            return
+        self._fraction_sum += 1.0 - record.fraction
+        record.status = FINISHED
+        self.finished_files += 1
+
+    @property
+    def percent(self):
+        """本輪的完成百分比，以檔案平均"""
+        return int(self._fraction_sum / max(1, self.run_files) * 100)
+
+
+class LazyJob:
+    """排程器佇列中的檔案工作，開始處理時才以 factory(path) 建立實際的工作"""
+    __slots__ = ('path', 'factory')
+
+    def __init__(self, path, factory):
+        self.path = path
+        self.factory = factory
+
+    def run(self):
+        self.factory(self.path).run()
@@ -0,0 +1,103 @@
+"""
+翻譯進度日誌。
+每個檔案一份追加式 JSON Lines 日誌，記錄已完成的字幕翻譯，中斷後可從斷點續譯。
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+# 累積多少筆或多少秒後寫入磁碟
+DEFAULT_FLUSH_EVERY = 20
+DEFAULT_FLUSH_INTERVAL = 2.0
+
+
+def hash_text(text):
+    """字幕原文的雜湊值，原文變更後舊的翻譯不會被沿用"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def get_journal_path(file_path, lang_suffix):
+    """日誌與原始檔案放在同一目錄，例如 movie.zh_tw.journal"""
+    dir_name, file_name = os.path.split(file_path)
+    name, _ = os.path.splitext(file_name)
+    return os.path.join(dir_name, f"{name}{lang_suffix}.journal")
+
+
+class TranslationJournal:
+    """追加式翻譯日誌，第一行為記錄模型與提示詞的標頭"""
+
+    def __init__(self, path, header, flush_every=DEFAULT_FLUSH_EVERY, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.path = path
+        self.header = header
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._file = None
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def load(self):
+        """讀取已完成的翻譯，回傳 {索引: (原文雜湊, 譯文)}；標頭不符時捨棄舊日誌"""
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+        try:
+            header = json.loads(lines[0]) if lines else None
+        except ValueError:
+            header = None
+        if header != self.header:
+            self.discard()
+            return entries
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+                entries[entry["i"]] = (entry["h"], entry["t"])
+            except (ValueError, KeyError, TypeError):
+                # 中斷時寫到一半的最後一行
+                continue
+        return entries
+
+    def record(self, index, source_text, translation):
+        """記錄一句已完成的翻譯"""
+        line = json.dumps({"i": index, "h": hash_text(source_text), "t": translation}, ensure_ascii=False)
+        with self._lock:
+            if self._file is None:
+                is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+                self._file = open(self.path, 'a', encoding='utf-8')
+                if is_new:
+                    self._file.write(json.dumps(self.header, ensure_ascii=False) + "\n")
+            self._file.write(line + "\n")
+            self._pending += 1
+            if self._pending >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._flush_locked()
+                self._file.close()
+                self._file = None
+
+    def discard(self):
+        """檔案完成後刪除日誌"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
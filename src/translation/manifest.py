@@ -0,0 +1,85 @@
+"""
+翻譯清單（manifest）。
+每個輸出檔案旁保存一份清單，記錄每句原文的雜湊值、時間與對應的譯文。
+重新翻譯修訂過的字幕時，原文未變的字幕直接沿用上次的譯文（只改了時間也套用新時間），
+只有新增或修改過的字幕才送給模型。
+本次的結果依字幕順序逐句寫入同目錄的暫存檔，不在記憶體中累積，完成時才取代舊清單。
+"""
+import json
+import os
+
+from src.utils.srt_stream import AtomicWriter
+
+MANIFEST_VERSION = 1
+
+
+def get_manifest_path(file_path, lang_suffix):
+    """清單與原始檔案放在同一目錄，例如 movie.zh_tw.manifest.json"""
+    dir_name, file_name = os.path.split(file_path)
+    name, _ = os.path.splitext(file_name)
+    return os.path.join(dir_name, f"{name}{lang_suffix}.manifest.json")
+
+
+class TranslationManifest:
+    """上次翻譯的結果，以及本次執行逐句寫出的新清單"""
+
+    def __init__(self, path, header):
+        self.path = path
+        self.header = dict(header, version=MANIFEST_VERSION)
+        self.count = 0
+        self._writer = None
+
+    def load(self):
+        """讀取上次的清單，回傳 {原文雜湊: (譯文, {(開始, 結束), ...})}；
+        同一句原文可能出現多次，保留每次出現的時間。標頭不符（模型、提示詞或語言變更）時回傳空字典"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("header") != self.header:
+            return {}
+        previous = {}
+        for entry in data.get("cues", ()):
+            try:
+                source_hash, start, end, translation = entry
+            except (TypeError, ValueError):
+                continue
+            entry = previous.get(source_hash)
+            if entry is None:
+                previous[source_hash] = (translation, {(start, end)})
+            else:
+                entry[1].add((start, end))
+        return previous
+
+    def _open(self):
+        self._writer = AtomicWriter(self.path).__enter__()
+        self._writer.write_text('{"header":%s,"cues":[' % _dumps(self.header))
+
+    def record(self, source_hash, start, end, translation):
+        """依字幕順序記錄本次一句字幕的結果，直接寫入暫存檔"""
+        if self._writer is None:
+            self._open()
+        self._writer.write_text(("," if self.count else "") + _dumps([source_hash, start, end, translation]))
+        self.count += 1
+
+    def save(self):
+        """寫完本次的清單並原子性地取代舊清單"""
+        if self._writer is None:
+            self._open()
+        self._writer.write_text("]}")
+        writer, self._writer = self._writer, None
+        self.count = 0
+        writer.__exit__(None, None, None)
+
+    def discard(self):
+        """翻譯中斷：刪除暫存檔，保留舊清單"""
+        if self._writer is not None:
+            writer, self._writer = self._writer, None
+            self.count = 0
+            writer.discard()
+            writer.__exit__(None, None, None)
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
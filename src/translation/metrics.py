@@ -0,0 +1,227 @@
+"""
+執行期統計。
+收集請求延遲、token 用量、佇列深度、重試與快取命中等資料，
+供 GUI 統計面板、定期 JSON 輸出與 Prometheus 文字格式端點使用。
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from src.utils.srt_stream import atomic_open
+
+# 請求延遲直方圖的分界（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# 百分位數以最近的樣本計算
+RECENT_SAMPLES = 2048
+# 每秒 token 數以最近幾秒計算
+RATE_WINDOW = 30.0
+# /metrics 端點預設只綁定本機
+DEFAULT_METRICS_HOST = '127.0.0.1'
+
+COUNTERS = (
+    ("requests", "送出的 LLM 請求數"),
+    ("request_errors", "失敗的 LLM 請求數"),
+    ("retries", "重試次數"),
+    ("cache_hits", "翻譯快取命中數"),
+    ("cache_misses", "翻譯快取未命中數"),
+    ("deduplicated", "檔案內重複而未送出的字幕數"),
+    ("single_flight_shared", "共用其他檔案進行中請求的字幕數"),
+    ("reused_cues", "沿用上次翻譯清單而未送出的字幕數"),
+    ("prompt_tokens", "提示詞 token 數（取自 API usage）"),
+    ("completion_tokens", "輸出 token 數（取自 API usage）"),
+    ("cues_translated", "完成翻譯的字幕數"),
+    ("cues_failed", "翻譯失敗的字幕數"),
+    ("files_completed", "完成的檔案數"),
+)
+
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return None
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+class Metrics:
+    """執行緒安全的統計資料"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scheduler = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.counters = {name: 0 for name, _ in COUNTERS}
+            self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+            self.latency_sum = 0.0
+            self.latency_count = 0
+            self.recent_latencies = deque(maxlen=RECENT_SAMPLES)
+            self._token_events = deque()
+            self.file_durations = deque(maxlen=100)
+
+    def bind_scheduler(self, scheduler):
+        """從排程器讀取進行中請求數與佇列深度"""
+        self._scheduler = scheduler
+
+    def inc(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def observe_request(self, latency, usage=None):
+        """記錄一次成功的請求與 API 回傳的 usage"""
+        now = time.monotonic()
+        with self._lock:
+            self.counters["requests"] += 1
+            self.latency_sum += latency
+            self.latency_count += 1
+            self.recent_latencies.append(latency)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    self.bucket_counts[i] += 1
+                    break
+            else:
+                self.bucket_counts[-1] += 1
+            if usage:
+                completion = int(usage.get("completion_tokens") or 0)
+                self.counters["prompt_tokens"] += int(usage.get("prompt_tokens") or 0)
+                self.counters["completion_tokens"] += completion
+                self._token_events.append((now, completion))
+            self._trim_token_events(now)
+
+    def observe_error(self):
+        with self._lock:
+            self.counters["requests"] += 1
+            self.counters["request_errors"] += 1
+
+    def record_file(self, path, seconds, cues):
+        """記錄單一檔案的處理時間"""
+        with self._lock:
+            self.counters["files_completed"] += 1
+            self.file_durations.append({"file": os.path.basename(path), "seconds": seconds, "cues": cues})
+
+    def _trim_token_events(self, now):
+        while self._token_events and now - self._token_events[0][0] > RATE_WINDOW:
+            self._token_events.popleft()
+
+    def snapshot(self):
+        """目前統計資料的字典"""
+        now = time.monotonic()
+        with self._lock:
+            self._trim_token_events(now)
+            ordered = sorted(self.recent_latencies)
+            recent_tokens = sum(tokens for _, tokens in self._token_events)
+            data = {
+                "uptime": time.time() - self.started,
+                "counters": dict(self.counters),
+                "latency": {
+                    "count": self.latency_count,
+                    "mean": self.latency_sum / self.latency_count if self.latency_count else None,
+                    "p50": _percentile(ordered, 50),
+                    "p95": _percentile(ordered, 95),
+                    "p99": _percentile(ordered, 99),
+                    "buckets": dict(zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], self.bucket_counts))
+                },
+                "completion_tokens_per_sec": recent_tokens / RATE_WINDOW,
+                "file_durations": list(self.file_durations)
+            }
+        scheduler = self._scheduler
+        if scheduler is not None:
+            data.update({
+                "in_flight": scheduler.in_flight,
+                "concurrency_limit": scheduler.current_limit,
+                "queued_files": scheduler.queued,
+                "active_files": scheduler.active_jobs
+            })
+        return data
+
+    def render_prometheus(self):
+        """Prometheus 文字格式"""
+        data = self.snapshot()
+        lines = []
+        for name, help_text in COUNTERS:
+            metric = f"srt_translator_{name}_total"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter",
+                      f"{metric} {data['counters'][name]}"]
+        metric = "srt_translator_request_latency_seconds"
+        lines += [f"# HELP {metric} LLM 請求延遲", f"# TYPE {metric} histogram"]
+        cumulative = 0
+        with self._lock:
+            bucket_counts = list(self.bucket_counts)
+            latency_sum, latency_count = self.latency_sum, self.latency_count
+        for bound, count in zip(list(LATENCY_BUCKETS) + ["+Inf"], bucket_counts):
+            cumulative += count
+            lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+        lines += [f"{metric}_sum {latency_sum}", f"{metric}_count {latency_count}"]
+        for name in ("in_flight", "concurrency_limit", "queued_files", "active_files", "completion_tokens_per_sec"):
+            if name in data:
+                metric = f"srt_translator_{name}"
+                lines += [f"# TYPE {metric} gauge", f"{metric} {data[name]}"]
+        return "\n".join(lines) + "\n"
+
+    def dump_json(self, path):
+        """將統計資料寫入 JSON 檔案（先寫暫存檔再取代）"""
+        with atomic_open(path) as f:
+            json.dump(self.snapshot(), f, indent=2, ensure_ascii=False)
+
+
+class MetricsDumper(threading.Thread):
+    """每隔一段時間將統計資料寫入 JSON 檔案"""
+
+    def __init__(self, metrics, path, interval=10.0):
+        super().__init__(daemon=True)
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.metrics.dump_json(self.path)
+
+    def stop(self):
+        """停止並寫出最後一次統計"""
+        self._stop_event.set()
+        self.metrics.dump_json(self.path)
+
+
+def start_prometheus_server(metrics, port, host=DEFAULT_METRICS_HOST):
+    """在背景執行緒提供 /metrics 端點；預設只綁定本機，要讓區網存取須明確指定 host"""
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = metrics.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+_default_metrics = None
+_default_lock = threading.Lock()
+
+
+def get_metrics():
+    """取得程式共用的統計資料"""
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics()
+        return _default_metrics
@@ -0,0 +1,50 @@
+"""
+模型清單。
+向 Ollama 取得可用模型時設定逾時，並把結果保存在磁碟上；
+下次開啟時先顯示上次的清單，再於背景更新。
+"""
+import json
+import os
+
+from src.utils.srt_stream import atomic_open
+
+DEFAULT_MODEL_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.srt_translator', 'models.json')
+# 取得模型清單的逾時（秒）
+MODEL_LIST_TIMEOUT = 5.0
+
+
+def load_cached_models(path=DEFAULT_MODEL_CACHE_PATH):
+    """讀取上次保存的模型清單，沒有或損壞時回傳空清單"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return []
+    models = data.get("models") if isinstance(data, dict) else None
+    if not isinstance(models, list):
+        return []
+    return [model for model in models if isinstance(model, str)]
+
+
+def save_cached_models(models, path=DEFAULT_MODEL_CACHE_PATH):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with atomic_open(path) as f:
+        json.dump({"models": list(models)}, f, ensure_ascii=False)
+
+
+def fetch_models(timeout=MODEL_LIST_TIMEOUT):
+    """向伺服器取得模型清單（/v1/models）；HTTP 用戶端在背景執行緒中才載入"""
+    from src.translation.endpoint_pool import get_client
+
+    models = get_client().get_json("/v1/models", timeout=timeout)
+    if isinstance(models, dict) and isinstance(models.get('data'), list):
+        return [model['id'] for model in models['data'] if isinstance(model, dict) and 'id' in model]
+    return []
+
+
+def refresh_models(path=DEFAULT_MODEL_CACHE_PATH, timeout=MODEL_LIST_TIMEOUT):
+    """取得最新的模型清單並保存；連線失敗時拋出例外，保留舊的快取"""
+    models = fetch_models(timeout)
+    if models and models != load_cached_models(path):
+        save_cached_models(models, path)
+    return models
@@ -0,0 +1,205 @@
+"""
+一個原始檔案同時翻譯成多個目標語言。
+原始檔案只解析一次並存入陣列（CueTable），每個語言的翻譯串流各自走訪；所有 (字幕, 語言) 的請求
+都經由同一個排程器的請求預算送出，並寫出每個語言的輸出檔案。
+可選擇把同一句字幕的多個目標語言合併成一個請求（LanguageBatcher）。
+"""
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from src.utils.file_utils import get_language_suffix
+from src.utils.srt_stream import CueTable
+from src.translation.single_flight import SingleFlight
+from src.translation.translation_thread import PACK_LINE_BREAK, RequestFailed
+
+# 其他語言尚未取用的合併翻譯結果上限
+MAX_STORED_RESULTS = 10000
+_MULTI_LINE_RE = re.compile(r'^\s*\[(\d+)\]\s*\[([A-Za-z0-9_-]+)\]\s?(.*)$')
+
+
+def parse_multi_reply(content, expected, codes):
+    """解析 "[n][語言代碼] 譯文" 格式的回覆，回傳每句的 {語言代碼: 譯文}；無法解析的行略過"""
+    parsed = [dict() for _ in range(expected)]
+    current = None
+    for line in content.splitlines():
+        match = _MULTI_LINE_RE.match(line)
+        if match:
+            number, code = int(match.group(1)), match.group(2).lower()
+            if 1 <= number <= expected and code in codes:
+                current = (number - 1, code)
+                parsed[current[0]][code] = match.group(3)
+                continue
+            current = None
+        elif current is not None and line.strip():
+            # 模型自行換行的內容接回上一句
+            parsed[current[0]][current[1]] += "\n" + line
+    return [
+        {code: text.replace(PACK_LINE_BREAK, "\n").strip() for code, text in item.items() if text.strip()}
+        for item in parsed
+    ]
+
+
+class LanguageBatcher:
+    """把同一句字幕的所有目標語言合併成一個請求，其他語言的串流取用已完成的結果"""
+
+    def __init__(self, threads):
+        self.threads = {thread.target_lang: thread for thread in threads}
+        self.codes = {}
+        for number, language in enumerate(self.threads, 1):
+            code = get_language_suffix(language).lstrip('.')
+            if code == 'unknown' or code in self.codes.values():
+                code = f"lang{number}"
+            self.codes[language] = code
+        self.flight = SingleFlight()
+        self._lock = threading.Lock()
+        # 原文 -> {語言: 譯文}，只保留尚未被該語言取用的結果
+        self._stored = OrderedDict()
+
+    def fetch(self, thread, texts):
+        """回傳 texts 翻譯成 thread.target_lang 的結果（失敗為 None）"""
+        language = thread.target_lang
+        results = [self._take(text, language) for text in texts]
+        owned, shared, calls = [], [], {}
+        for i, result in enumerate(results):
+            if result is None:
+                leader, calls[i] = self.flight.acquire(texts[i])
+                (owned if leader else shared).append(i)
+
+        if owned:
+            try:
+                translated = self._request(thread, [texts[i] for i in owned])
+            except BaseException as e:
+                for i in owned:
+                    self.flight.fail(texts[i], calls[i], e)
+                raise
+            if isinstance(translated, RequestFailed):
+                # 請求本身失敗：不改以單一語言逐一重送，交由視窗重新排入
+                for i in owned:
+                    results[i] = translated
+                    self.flight.resolve(texts[i], calls[i], translated)
+            else:
+                for i, by_language in zip(owned, translated):
+                    results[i] = by_language.pop(language, None)
+                    self._store(texts[i], by_language)
+                    self.flight.resolve(texts[i], calls[i], by_language)
+        for i in shared:
+            try:
+                shared_result = calls[i].wait()
+            except Exception:
+                shared_result = None
+            if isinstance(shared_result, RequestFailed):
+                results[i] = shared_result
+            else:
+                results[i] = self._take(texts[i], language)
+
+        # 合併回覆中缺少的語言改以單一語言的請求補上
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            if len(missing) == 1:
+                retried = [thread.fetch(texts[missing[0]])]
+            else:
+                retried = thread._fetch_packed_split([texts[i] for i in missing])
+            for i, result in zip(missing, retried):
+                results[i] = result
+        return results
+
+    def _request(self, thread, texts):
+        """以一個請求翻譯成所有目標語言，回傳每句的 {語言: 譯文}；請求失敗時回傳 RequestFailed"""
+        targets = ", ".join(f"[{code}] {language}" for language, code in self.codes.items())
+        numbered = "\n".join(
+            f"[{i}] {text.replace(chr(10), PACK_LINE_BREAK)}" for i, text in enumerate(texts, 1)
+        )
+        content = thread._chat(
+            f"Translate each numbered subtitle below into each of these languages: {targets}.\n"
+            f"Reply with exactly {len(texts) * len(self.codes)} lines in the format \"[n][code] translation\", "
+            f"one line per subtitle and language, keeping the numbers and language codes. "
+            f"Line breaks inside a subtitle are written as {PACK_LINE_BREAK}; keep them.\n"
+            f"{numbered}"
+        )
+        if isinstance(content, RequestFailed):
+            return content
+        if not content:
+            return [{} for _ in texts]
+        languages = {code: language for language, code in self.codes.items()}
+        translated = []
+        for text, by_code in zip(texts, parse_multi_reply(content, len(texts), set(languages))):
+            by_language = {languages[code]: result for code, result in by_code.items()}
+            # 其他語言的結果也寫入各自的翻譯記憶
+            for language, result in by_language.items():
+                other = self.threads[language]
+                if other is not thread:
+                    other._cache_put(other._request_key(text), result)
+            translated.append(by_language)
+        return translated
+
+    def _store(self, text, by_language):
+        if not by_language:
+            return
+        with self._lock:
+            stored = self._stored.setdefault(text, {})
+            stored.update(by_language)
+            self._stored.move_to_end(text)
+            while len(self._stored) > MAX_STORED_RESULTS:
+                # 某個語言沒有取用（例如命中快取）的結果不會無限累積
+                self._stored.popitem(last=False)
+
+    def _take(self, text, language):
+        with self._lock:
+            stored = self._stored.get(text)
+            if stored is None:
+                return None
+            result = stored.pop(language, None)
+            if not stored:
+                del self._stored[text]
+            return result
+
+
+class MultiTargetJob:
+    """把一個原始檔案翻譯成多個目標語言的工作，可直接交給排程器"""
+
+    def __init__(self, threads, pack_languages=False):
+        if not threads:
+            raise ValueError("至少需要一個目標語言")
+        if len(threads) > 1 and any(thread.replace_original for thread in threads):
+            raise ValueError("多個目標語言不能取代原始檔案")
+        self.threads = list(threads)
+        self.file_path = self.threads[0].file_path
+        self.profiler = self.threads[0].profiler
+        if pack_languages and len(self.threads) > 1:
+            batcher = LanguageBatcher(self.threads)
+            for thread in self.threads:
+                thread.language_batcher = batcher
+
+    def run(self):
+        with self.profiler.profile_file(self.file_path):
+            self._run()
+
+    def _run(self):
+        started = time.monotonic()
+        targets = []
+        for thread in self.threads:
+            output_path = thread.prepare_output()
+            if output_path:
+                targets.append((thread, output_path))
+        if not targets:
+            return
+
+        # 只解析一次；陣列只在這個檔案處理期間存在，每個語言走訪時各自產生 SrtCue 複本
+        with self.profiler.span("parse"):
+            table = CueTable.load(self.file_path)
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            results = loop.run_until_complete(asyncio.gather(*(
+                thread.translate_file_async(iter(table), len(table), output_path, started)
+                for thread, output_path in targets
+            ), return_exceptions=True))
+        finally:
+            loop.close()
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
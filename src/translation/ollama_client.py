@@ -0,0 +1,129 @@
+"""
+Ollama HTTP 客戶端。
+以有限大小的 http.client 連線池維持 keep-alive 連線，供所有檔案共用。
+多台主機的分配見 endpoint_pool.py。
+"""
+import http.client
+import json
+import threading
+import urllib.parse
+
+from src.translation.scheduler import DEFAULT_MAX_REQUESTS
+from src.utils.profiling import get_profiler
+
+DEFAULT_BASE_URL = "http://localhost:11434"
+# 連線數與全域請求預算一致
+DEFAULT_POOL_SIZE = DEFAULT_MAX_REQUESTS
+
+# 重用閒置連線時，若伺服器已關閉連線會出現這些例外，換一條新連線重送即可
+_STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionResetError, BrokenPipeError)
+
+
+class OllamaHTTPError(Exception):
+    """伺服器回應非 2xx 狀態碼"""
+
+    def __init__(self, status, body):
+        super().__init__(f"HTTP {status}: {body[:200]!r}")
+        self.status = status
+        self.body = body
+
+
+class OllamaClient:
+    """連到單一 Ollama 端點的 keep-alive 連線池"""
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, pool_size=DEFAULT_POOL_SIZE, timeout=None):
+        parts = urllib.parse.urlsplit(base_url)
+        self.base_url = base_url.rstrip('/')
+        self.scheme = parts.scheme or 'http'
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port
+        self.timeout = timeout
+        self.pool_size = max(1, int(pool_size))
+        self._idle = []
+        self._open = 0
+        self._cond = threading.Condition()
+
+    def resize(self, pool_size):
+        """調整連線池大小，多出的閒置連線會被關閉"""
+        with self._cond:
+            self.pool_size = max(1, int(pool_size))
+            while self._idle and self._open > self.pool_size:
+                self._idle.pop().close()
+                self._open -= 1
+            self._cond.notify_all()
+
+    def close(self):
+        """關閉所有閒置連線"""
+        with self._cond:
+            while self._idle:
+                self._idle.pop().close()
+                self._open -= 1
+
+    def get_json(self, path, timeout=None):
+        return self.request('GET', path, timeout=timeout)
+
+    def post_json(self, path, payload, timeout=None):
+        return self.request('POST', path, payload, timeout=timeout)
+
+    def request(self, method, path, payload=None, timeout=None):
+        """送出請求並回傳解析後的 JSON"""
+        profiler = get_profiler()
+        with profiler.span("json_encode"):
+            body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+        conn, reused = self._acquire()
+        try:
+            try:
+                status, data, will_close = self._send(conn, method, path, body, headers, timeout)
+            except _STALE_ERRORS:
+                if not reused:
+                    raise
+                # 閒置連線已失效，改用新連線重送一次
+                conn.close()
+                conn = self._new_connection()
+                status, data, will_close = self._send(conn, method, path, body, headers, timeout)
+        except BaseException:
+            conn.close()
+            self._release(None)
+            raise
+        if not self._release(None if will_close else conn):
+            conn.close()
+        if status >= 400:
+            raise OllamaHTTPError(status, data)
+        with profiler.span("json_decode"):
+            return json.loads(data.decode('utf-8'))
+
+    def _send(self, conn, method, path, body, headers, timeout):
+        conn.timeout = timeout if timeout is not None else self.timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(conn.timeout)
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        data = response.read()
+        return response.status, data, response.will_close
+
+    def _new_connection(self):
+        cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def _acquire(self):
+        """取得一條連線，回傳 (連線, 是否為重用的閒置連線)"""
+        with self._cond:
+            while not self._idle and self._open >= self.pool_size:
+                self._cond.wait()
+            if self._idle:
+                return self._idle.pop(), True
+            self._open += 1
+        return self._new_connection(), False
+
+    def _release(self, conn):
+        """歸還連線，回傳是否放回閒置池；未放回的連線由呼叫者關閉"""
+        with self._cond:
+            kept = conn is not None and self._open <= self.pool_size
+            if kept:
+                self._idle.append(conn)
+            else:
+                self._open -= 1
+            self._cond.notify()
+            return kept
+
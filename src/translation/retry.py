@@ -0,0 +1,104 @@
+"""
+LLM 請求的重試、逾時與斷路器策略。
+"""
+import http.client
+import random
+import socket
+import threading
+import time
+
+from src.translation.ollama_client import OllamaHTTPError
+
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 30.0
+
+# 伺服器暫時性錯誤，可以重試
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class RetryPolicy:
+    """每次請求的逾時與指數退避（含隨機抖動）重試設定"""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES,
+                 base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt):
+        """第 attempt 次重試前的等待秒數（full jitter）"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    @staticmethod
+    def is_retryable(error):
+        """連線錯誤、逾時與 5xx/429 可以重試；格式錯誤或 4xx 重試也不會成功"""
+        if isinstance(error, OllamaHTTPError):
+            return error.status in RETRYABLE_STATUS
+        return isinstance(error, (socket.timeout, TimeoutError, ConnectionError, http.client.HTTPException, OSError))
+
+
+class CircuitBreaker:
+    """連續失敗達門檻時暫停送出請求，冷卻後只放行一個試探請求"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._cond = threading.Condition()
+
+    def wait_until_available(self):
+        """斷路器開啟時阻塞，直到可以送出請求"""
+        with self._cond:
+            while True:
+                if self.state == self.CLOSED:
+                    return
+                if self.state == self.OPEN:
+                    remaining = self._opened_at + self.reset_timeout - time.monotonic()
+                    if remaining > 0:
+                        self._cond.wait(remaining)
+                        continue
+                    self.state = self.HALF_OPEN
+                if not self._probing:
+                    # 半開狀態只放行一個試探請求，其餘等待結果
+                    self._probing = True
+                    return
+                self._cond.wait()
+
+    def record_success(self):
+        with self._cond:
+            self._failures = 0
+            self._probing = False
+            self.state = self.CLOSED
+            self._cond.notify_all()
+
+    def record_failure(self):
+        with self._cond:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probing = False
+            self._cond.notify_all()
+
+
+_default_breaker = None
+_default_lock = threading.Lock()
+
+
+def get_circuit_breaker():
+    """取得所有檔案共用的斷路器"""
+    global _default_breaker
+    with _default_lock:
+        if _default_breaker is None:
+            _default_breaker = CircuitBreaker()
+        return _default_breaker
@@ -0,0 +1,184 @@
+"""
+全域翻譯排程器。
+所有檔案共用一組固定的請求槽位，並以檔案工作佇列限制同時處理的檔案數。
+"""
+import os
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from queue import Queue
+
+# 預設值：同時處理的檔案數與同時送出的請求數
+DEFAULT_MAX_FILES = 2
+DEFAULT_MAX_REQUESTS = int(os.environ.get('OLLAMA_NUM_PARALLEL', '5'))
+
+
+class AIMDLimiter:
+    """依觀察到的延遲與錯誤調整並行上限（加性增加、乘性減少）
+
+    請求失敗或延遲超過基準的 latency_tolerance 倍時視為壅塞，上限乘以 backoff_ratio；
+    否則在並行數接近上限時每輪增加約 1。基準延遲取觀察到的最低值，並緩慢上調以適應模型變化。
+    上次減少之前就已送出的請求不會再次觸發減少，避免一次壅塞讓上限連續崩跌。
+    """
+
+    def __init__(self, max_limit, min_limit=1, initial_limit=None, backoff_ratio=0.7,
+                 latency_tolerance=2.0, baseline_decay=1.001):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(initial_limit if initial_limit is not None else min(max_limit, 4))
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.baseline_decay = baseline_decay
+        self.baseline = None
+        self._last_decrease = 0.0
+
+    def on_sample(self, started_at, latency, error, in_flight):
+        """記錄一次請求結果，回傳新的上限"""
+        if not error:
+            if self.baseline is None or latency < self.baseline:
+                self.baseline = latency
+            else:
+                self.baseline *= self.baseline_decay
+        congested = error or (self.baseline is not None and latency > self.baseline * self.latency_tolerance)
+        if congested:
+            if started_at >= self._last_decrease:
+                self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+                self._last_decrease = started_at + latency
+        elif in_flight * 2 >= self.limit:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        return self.limit
+
+
+class TranslationScheduler:
+    """管理檔案工作佇列與全域的請求並行預算"""
+
+    def __init__(self, max_files=DEFAULT_MAX_FILES, max_requests=DEFAULT_MAX_REQUESTS, adaptive=False):
+        self.max_files = max(1, int(max_files))
+        self.max_requests = max(1, int(max_requests))
+        # 自適應模式下由 limiter 決定實際上限，max_requests 為其上界
+        self.limiter = AIMDLimiter(self.max_requests) if adaptive else None
+        self._jobs = Queue()
+        self._lock = threading.Lock()
+        self._workers = set()
+        self._active_jobs = 0
+        self._request_cond = threading.Condition()
+        self._in_flight = 0
+
+    def configure(self, max_files=None, max_requests=None, adaptive=None):
+        """調整檔案層級與請求層級的並行上限，adaptive 切換自適應並行模式"""
+        if max_files is not None:
+            with self._lock:
+                self.max_files = max(1, int(max_files))
+            self._ensure_workers()
+        with self._request_cond:
+            if max_requests is not None:
+                self.max_requests = max(1, int(max_requests))
+            if adaptive is not None and adaptive != (self.limiter is not None):
+                self.limiter = AIMDLimiter(self.max_requests) if adaptive else None
+            if self.limiter is not None:
+                self.limiter.max_limit = self.max_requests
+                self.limiter.limit = min(self.limiter.limit, self.max_requests)
+            self._request_cond.notify_all()
+
+    def submit(self, job):
+        """將檔案工作加入佇列，job 需提供 run() 方法"""
+        self._jobs.put(job)
+        self._ensure_workers()
+
+    def wait(self):
+        """阻塞直到佇列中的所有檔案工作完成"""
+        self._jobs.join()
+
+    @property
+    def in_flight(self):
+        """目前進行中的請求數"""
+        return self._in_flight
+
+    @property
+    def current_limit(self):
+        """目前實際生效的請求並行上限"""
+        if self.limiter is not None:
+            return max(1, int(self.limiter.limit))
+        return self.max_requests
+
+    @property
+    def queued(self):
+        """尚未開始處理的檔案數"""
+        return self._jobs.qsize()
+
+    @property
+    def pending(self):
+        """尚未完成的檔案數（含處理中）"""
+        return self._jobs.unfinished_tasks
+
+    @property
+    def active_jobs(self):
+        """正在處理中的檔案數"""
+        return self._active_jobs
+
+    @contextmanager
+    def request_slot(self, is_congestion=None):
+        """取得一個請求槽位，所有檔案共用同一個預算。
+        is_congestion(例外) 回傳 False 的錯誤（例如 4xx）不代表壅塞，不計入自適應上限與延遲基準"""
+        with self._request_cond:
+            while self._in_flight >= self.current_limit:
+                self._request_cond.wait()
+            self._in_flight += 1
+        start = time.monotonic()
+        error = True
+        sample = True
+        try:
+            yield
+            error = False
+        except Exception as e:
+            if is_congestion is not None and not is_congestion(e):
+                sample = False
+            raise
+        finally:
+            with self._request_cond:
+                if self.limiter is not None and sample:
+                    self.limiter.on_sample(start, time.monotonic() - start, error, self._in_flight)
+                self._in_flight -= 1
+                self._request_cond.notify_all()
+
+    def _ensure_workers(self):
+        """補足檔案工作執行緒至 max_files 個"""
+        with self._lock:
+            while len(self._workers) < self.max_files:
+                worker = threading.Thread(target=self._worker_loop, daemon=True)
+                self._workers.add(worker)
+                worker.start()
+
+    def _worker_loop(self):
+        current = threading.current_thread()
+        while True:
+            # 上限被調低時，多餘的執行緒在取下一個工作前結束
+            with self._lock:
+                if len(self._workers) > self.max_files:
+                    self._workers.discard(current)
+                    return
+            job = self._jobs.get()
+            with self._lock:
+                self._active_jobs += 1
+            try:
+                job.run()
+            except Exception:
+                traceback.print_exc()
+            finally:
+                with self._lock:
+                    self._active_jobs -= 1
+                self._jobs.task_done()
+
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+
+def get_scheduler():
+    """取得程式共用的排程器"""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = TranslationScheduler()
+        return _default_scheduler
@@ -0,0 +1,85 @@
+"""
+跨檔案的請求合併（single-flight）。
+同一句字幕（相同文字、語言、模型與提示詞）同時只會有一個請求在進行，
+其他檔案的相同字幕等待並共用該請求的結果。
+"""
+import threading
+
+
+class _Call:
+    """一個進行中的請求"""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self):
+        """等待結果；請求拋出例外時在等待者中重新拋出"""
+        self._done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """以鍵值合併同時進行的相同請求"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def acquire(self, key):
+        """回傳 (是否由呼叫者負責送出, 請求)；負責送出時必須呼叫 resolve() 或 fail()"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                return False, call
+            call = self._calls[key] = _Call()
+            return True, call
+
+    def resolve(self, key, call, result):
+        """公布結果並喚醒所有等待者"""
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.result = result
+        call._done.set()
+
+    def fail(self, key, call, error):
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.error = error
+        call._done.set()
+
+    def do(self, key, fn):
+        """執行 fn()，相同鍵值的同時呼叫只會執行一次並共用結果"""
+        leader, call = self.acquire(key)
+        if not leader:
+            return call.wait()
+        try:
+            result = fn()
+        except BaseException as e:
+            self.fail(key, call, e)
+            raise
+        self.resolve(key, call, result)
+        return result
+
+    @property
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+_default_flight = None
+_default_lock = threading.Lock()
+
+
+def get_single_flight():
+    """取得所有檔案共用的請求合併表"""
+    global _default_flight
+    with _default_lock:
+        if _default_flight is None:
+            _default_flight = SingleFlight()
+        return _default_flight
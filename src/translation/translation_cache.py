@@ -0,0 +1,147 @@
+"""
+翻譯記憶快取。
+以 SQLite (WAL 模式) 在磁碟上保存翻譯結果，重新翻譯相同內容時直接取用。
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.srt_translator', 'translation_cache.sqlite3')
+DEFAULT_MAX_ENTRIES = 200000
+DEFAULT_MAX_AGE_DAYS = 90
+# 每寫入多少筆執行一次淘汰
+EVICT_INTERVAL = 1000
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """正規化字幕文字：去除首尾空白並合併連續空白"""
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+def hash_prompt(prompt):
+    """系統提示詞的雜湊值，提示詞變更後舊的翻譯不會被沿用"""
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+
+class TranslationCache:
+    """以 (模型, 提示詞雜湊, 原文語言, 目標語言, 正規化文字) 為鍵的翻譯記憶"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_age_days=DEFAULT_MAX_AGE_DAYS, enabled=True):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._puts_since_evict = 0
+
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS translations ('
+                ' key TEXT PRIMARY KEY,'
+                ' translation TEXT NOT NULL,'
+                ' created REAL NOT NULL,'
+                ' last_used REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_last_used ON translations(last_used)')
+            conn.commit()
+            self._conn = conn
+            self._evict_locked()
+        return self._conn
+
+    @staticmethod
+    def make_key(model_name, prompt_hash, source_lang, target_lang, text):
+        raw = json.dumps([model_name, prompt_hash, source_lang, target_lang, normalize_text(text)], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """查詢翻譯，未啟用或未命中時回傳 None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute('SELECT translation FROM translations WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            conn.execute('UPDATE translations SET last_used = ? WHERE key = ?', (time.time(), key))
+            conn.commit()
+            return row[0]
+
+    def put(self, key, translation):
+        """保存翻譯結果"""
+        if not self.enabled or not translation:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO translations (key, translation, created, last_used) VALUES (?, ?, ?, ?)',
+                (key, translation, now, now)
+            )
+            conn.commit()
+            self._puts_since_evict += 1
+            if self._puts_since_evict >= EVICT_INTERVAL:
+                self._evict_locked()
+
+    def evict(self):
+        """依存活時間與筆數上限淘汰舊資料"""
+        with self._lock:
+            self._connect()
+            self._evict_locked()
+
+    def _evict_locked(self):
+        self._puts_since_evict = 0
+        conn = self._conn
+        if self.max_age_days:
+            cutoff = time.time() - self.max_age_days * 86400
+            conn.execute('DELETE FROM translations WHERE last_used < ?', (cutoff,))
+        if self.max_entries:
+            conn.execute(
+                'DELETE FROM translations WHERE key IN ('
+                ' SELECT key FROM translations ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+        conn.commit()
+
+    def stats(self):
+        """回傳命中、未命中與目前筆數"""
+        with self._lock:
+            entries = self._connect().execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_cache():
+    """取得程式共用的翻譯快取"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = TranslationCache()
+        return _default_cache
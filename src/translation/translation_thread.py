@@ -2,14 +2,88 @@ import threading
 import asyncio
 import os
 import json
-import urllib.request
-import pysrt
+import re
+import sqlite3
+import time
+from collections import deque
 from queue import Queue
+from concurrent.futures import ThreadPoolExecutor
+
+from src.utils.file_utils import backup_file, get_available_path, get_output_path, get_language_suffix
+from src.utils.srt_stream import iter_cues, count_cues, SrtWriter
+from src.translation.scheduler import get_scheduler
+from src.translation.endpoint_pool import get_client
+from src.translation.translation_cache import get_cache, hash_prompt, normalize_text
+from src.translation.single_flight import get_single_flight
+from src.translation.journal import TranslationJournal, get_journal_path, hash_text
+from src.translation.manifest import TranslationManifest, get_manifest_path
+from src.translation.retry import RetryPolicy, get_circuit_breaker
+from src.translation.metrics import get_metrics
+from src.translation.chat_backend import get_backend
+from src.utils.profiling import get_profiler
+
+# 打包翻譯時用來表示字幕內換行的標記
+PACK_LINE_BREAK = "<br>"
+# 同一句字幕在一個檔案內最多重新排入佇列的次數
+MAX_REQUEUE = 2
+# 檔案內去重時記住的已翻譯句數上限
+MAX_DEDUP_ENTRIES = 10000
+_PACKED_LINE_RE = re.compile(r'^\s*\[(\d+)\]\s?(.*)$')
+
+
+class RequestFailed:
+    """請求最終失敗（沒有收到回覆）的結果；視為假值，與收到但無法解析的回覆區分。
+    retryable 為 False（例如 4xx）表示重送也不會成功"""
+    __slots__ = ('retryable',)
+
+    def __init__(self, retryable):
+        self.retryable = retryable
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return "REQUEST_FAILED" if self.retryable else "REQUEST_REJECTED"
+
+
+# 暫時性錯誤（逾時、連線錯誤、5xx）重試用盡
+REQUEST_FAILED = RequestFailed(True)
+# 伺服器拒絕（4xx、回覆格式錯誤）
+REQUEST_REJECTED = RequestFailed(False)
+
+
+def should_requeue(result):
+    """失敗的字幕是否值得重新排入佇列：伺服器拒絕的請求重送也會失敗"""
+    return not result and (not isinstance(result, RequestFailed) or result.retryable)
+
+
+def parse_packed_reply(content, expected):
+    """解析 "[n] 譯文" 格式的回覆，編號重複、超出範圍或譯文為空時回傳 None"""
+    parsed = {}
+    current = None
+    for line in content.splitlines():
+        match = _PACKED_LINE_RE.match(line)
+        if match:
+            current = int(match.group(1))
+            if current in parsed or not 1 <= current <= expected:
+                return None
+            parsed[current] = match.group(2)
+        elif current is not None and line.strip():
+            # 模型自行換行的內容接回上一句
+            parsed[current] += "\n" + line
+        elif line.strip():
+            return None
+    result = {
+        number: text.replace(PACK_LINE_BREAK, "\n").strip()
+        for number, text in parsed.items()
+    }
+    if not all(result.values()):
+        return None
+    return result
 
-from src.utils.file_utils import ensure_backup_dir, get_output_path
 
 class TranslationThread(threading.Thread):
-    def __init__(self, file_path, source_lang, target_lang, model_name, parallel_requests, progress_callback, complete_callback, debug_mode=False, replace_original=False, use_alt_prompt=False):
+    def __init__(self, file_path, source_lang, target_lang, model_name, parallel_requests, progress_callback, complete_callback, debug_mode=False, replace_original=False, use_alt_prompt=False, scheduler=None, use_cache=True, cache=None, pack_size=1, conflict_policy=None, retry_policy=None, circuit_breaker=None, metrics=None, profiler=None, backend=None, single_flight=None, incremental=True):
         threading.Thread.__init__(self)
         self.file_path = file_path
         self.source_lang = source_lang
@@ -22,80 +96,474 @@ class TranslationThread(threading.Thread):
         self.app = None
         self.replace_original = replace_original
         self.use_alt_prompt = use_alt_prompt
+        # 所有檔案共用的請求預算
+        self.scheduler = scheduler or get_scheduler()
+        # 翻譯記憶快取，use_cache=False 時略過
+        self.use_cache = use_cache
+        self.cache = cache or get_cache()
+        self._system_prompt = None
+        self._prompt_hash = None
+        # 每個請求打包的字幕句數，1 表示逐句翻譯
+        self.pack_size = pack_size
+        # 檔案衝突的固定處理方式（overwrite/rename/skip），None 時詢問 GUI
+        self.conflict_policy = conflict_policy
+        self.output_path = None
+        # 逾時、重試與斷路器設定
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or get_circuit_breaker()
+        self.failed_count = 0
+        # 執行期統計（延遲、token 用量、快取命中等）
+        self.metrics = metrics or get_metrics()
+        # 選用的效能剖析，未啟用時不影響效能
+        self.profiler = profiler or get_profiler()
+        # 對話 API 格式（OpenAI 相容或 Ollama 原生）
+        self.backend = backend or get_backend()
+        # 所有檔案共用：相同字幕同時只送出一個請求
+        self.single_flight = single_flight or get_single_flight()
+        # 沿用翻譯清單中原文未變的字幕，只翻譯新增或修改的字幕
+        self.incremental = incremental
+        # 多語言翻譯時可把同一句的多個目標語言合併成一個請求（見 multi_target）
+        self.language_batcher = None
+        self.reused_count = 0
+        self.retimed_count = 0
 
     def set_app(self, app):
         """設置對 App 實例的引用"""
         self.app = app
         
     def run(self):
-        subs = pysrt.open(self.file_path)
-        total_subs = len(subs)
-        batch_size = int(self.parallel_requests)
+        with self.profiler.profile_file(self.file_path):
+            self._run()
+
+    def _run(self):
+        started = time.monotonic()
+        output_path = self.prepare_output()
+        if not output_path:
+            return
+
+        with self.profiler.span("count"):
+            total = count_cues(self.file_path)
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(
+                self.translate_file_async(iter_cues(self.file_path), total, output_path, started)
+            )
+        finally:
+            loop.close()
 
+    def prepare_output(self):
+        """取代原始檔案時先備份，並決定輸出路徑；跳過的檔案回傳 None"""
         # 如果是取代原始檔案模式，先創建備份
         if self.replace_original:
             try:
-                backup_path = os.path.join(os.path.dirname(self.file_path), 'backup')
-                ensure_backup_dir(backup_path)
-                backup_file = os.path.join(backup_path, os.path.basename(self.file_path))
-                import shutil
-                shutil.copy2(self.file_path, backup_file)
+                with self.profiler.span("backup"):
+                    backup_file(self.file_path)
             except Exception as e:
                 self.complete_callback(f"警告：無法創建備份檔案：{str(e)}")
 
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        # 先決定輸出路徑，譯文會邊翻譯邊寫出；跳過的檔案不必翻譯
+        output_path = self.get_output_path()
+        self.output_path = output_path
+        if not output_path:
+            self.complete_callback(f"已跳過檔案: {self.file_path}")
+        return output_path
 
-        for i in range(0, total_subs, batch_size):
-            batch = subs[i:i+batch_size]
-            texts = [sub.text for sub in batch]
-            results = loop.run_until_complete(self.translate_batch_async(texts))
-            
-            for sub, result in zip(batch, results):
-                if result:
-                    if self.debug_mode:
-                        print(f"\n原始文本: {sub.text}")
-                        print(f"翻譯結果: {result}")
-                        print("-" * 50)
-                    sub.text = result
-                
-            self.progress_callback(min(i+batch_size, total_subs), total_subs)
+    async def translate_file_async(self, cues, total, output_path, started):
+        """翻譯一個檔案的字幕並寫出到 output_path；cues 可以是多個目標語言共用的解析結果"""
+        profiler = self.profiler
+        window_size = int(self.parallel_requests)
 
-        loop.close()
+        # 讀取進度日誌，已完成的字幕直接套用，只排程剩餘部分
+        with profiler.span("journal_load"):
+            journal = self._open_journal()
+            resumed = journal.load()
+        if resumed and self.debug_mode:
+            print(f"從進度日誌恢復 {len(resumed)}/{total} 句: {self.file_path}")
+        # 上次翻譯的清單：原文雜湊相同的字幕沿用譯文
+        with profiler.span("manifest_load"):
+            manifest = self._open_manifest()
+            previous = manifest.load() if self.incremental else {}
 
-        output_path = self.get_output_path()
-        if output_path:  # 只有在有效的輸出路徑時才保存
-            subs.save(output_path, encoding='utf-8')
-            self.complete_callback(f"翻譯完成 | 檔案已成功保存為: {output_path}")
-        else:
-            self.complete_callback(f"已跳過檔案: {self.file_path}")
+        try:
+            with profiler.span("translate"), SrtWriter(output_path) as writer:
+                self.failed_count = await self.translate_stream_async(
+                    cues, total, window_size, journal, resumed, writer, manifest, previous
+                )
+        except BaseException:
+            manifest.discard()
+            raise
+        finally:
+            journal.close()
+        with profiler.span("manifest_write"):
+            manifest.save()
+        self.metrics.record_file(self.file_path, time.monotonic() - started, total)
 
-    async def translate_batch_async(self, texts):
-        loop = asyncio.get_event_loop()
-        tasks = [loop.run_in_executor(None, self.fetch, text) for text in texts]
-        return await asyncio.gather(*tasks)
+        notes = []
+        if self.reused_count:
+            notes.append(f"沿用上次翻譯 {self.reused_count} 句" +
+                         (f"，其中 {self.retimed_count} 句更新時間" if self.retimed_count else ""))
+        if self.failed_count:
+            # 保留日誌，重新執行時只會翻譯失敗的字幕
+            notes.append(f"{self.failed_count} 句翻譯失敗，保留原文")
+        else:
+            journal.discard()
+        suffix = f"（{'；'.join(notes)}）" if notes else ""
+        self.complete_callback(f"翻譯完成 | 檔案已成功保存為: {output_path}{suffix}")
 
-    def fetch(self, text):
-        url = "http://localhost:11434/v1/chat/completions"
-        system_prompt = self._get_system_prompt()
-        payload = {
+    def _run_header(self):
+        """影響翻譯結果的設定，日誌與清單的標頭"""
+        return {
+            "file": os.path.basename(self.file_path),
             "model": self.model_name,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Translate the following text to {self.target_lang}:\n{text}"}
-            ],
-            "stream": False,
-            "temperature": 0.1  # 降低溫度以獲得更穩定的輸出
+            "prompt": hash_prompt(self._get_system_prompt()),
+            "source_lang": self.source_lang,
+            "target_lang": self.target_lang
         }
-        req = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'), headers={'Content-Type': 'application/json'})
+
+    def _open_journal(self):
+        """建立此檔案的進度日誌"""
+        path = get_journal_path(self.file_path, get_language_suffix(self.target_lang))
+        return TranslationJournal(path, self._run_header())
+
+    def _open_manifest(self):
+        """建立此檔案的翻譯清單"""
+        path = get_manifest_path(self.file_path, get_language_suffix(self.target_lang))
+        return TranslationManifest(path, self._run_header())
+
+    async def translate_stream_async(self, cues, total, window_size, journal, resumed, writer, manifest, previous):
+        """串流翻譯：邊讀取邊以滑動視窗送出請求，任一請求完成就補上下一組，並依原始順序寫出"""
+        loop = asyncio.get_event_loop()
+        profiler = self.profiler
+        pack_size = max(1, int(self.pack_size))
+        # 已讀取但尚未寫出的字幕上限，避免單一慢請求讓緩衝區無限成長
+        max_buffered = max(1, window_size) * pack_size * 4
+        cue_iter = enumerate(cues)
+        buffered = {}
+        ready = set()
+        pending = {}
+        next_write = 0
+        completed = 0
+        failed = 0
+        exhausted = False
+        # 翻譯失敗的字幕重新排入佇列，每句最多 MAX_REQUEUE 次
+        requeue = deque()
+        attempts = {}
+        # 檔案內去重：正規化文字相同的字幕只送出第一句，其餘等待或沿用其結果
+        translated_texts = {}
+        leaders = {}
+        followers = {}
+        unit_keys = {}
+        # 送出翻譯的字幕原文雜湊；有譯文的字幕在依序寫出時記錄到清單
+        source_hashes = {}
+        manifest_hashes = {}
+
+        def read_unit():
+            """讀取下一組待翻譯的字幕；日誌或清單中已有譯文、或與先前字幕重複的字幕不送出"""
+            nonlocal exhausted, completed
+            unit = []
+            while len(unit) < pack_size and requeue:
+                unit.append(requeue.popleft())
+            while len(unit) < pack_size and not exhausted and len(buffered) < max_buffered:
+                with profiler.span("parse"):
+                    item = next(cue_iter, None)
+                if item is None:
+                    exhausted = True
+                    break
+                index, cue = item
+                buffered[index] = cue
+                source_hash = hash_text(cue.text)
+                entry = resumed.pop(index, None)
+                if entry is not None and entry[0] == source_hash:
+                    manifest_hashes[index] = source_hash
+                    cue.text = entry[1]
+                    ready.add(index)
+                    completed += 1
+                    continue
+                reused = previous.get(source_hash)
+                if reused is not None:
+                    # 原文未變：沿用上次的譯文，時間則以目前的原文為準
+                    translation, timings = reused
+                    manifest_hashes[index] = source_hash
+                    if (cue.start, cue.end) not in timings:
+                        self.retimed_count += 1
+                    self.reused_count += 1
+                    self.metrics.inc("reused_cues")
+                    cue.text = translation
+                    ready.add(index)
+                    completed += 1
+                    continue
+                source_hashes[index] = source_hash
+                key = normalize_text(cue.text)
+                if key in translated_texts:
+                    finish(index, translated_texts[key])
+                    self.metrics.inc("deduplicated")
+                elif key in leaders:
+                    followers[leaders[key]].append(index)
+                    self.metrics.inc("deduplicated")
+                else:
+                    leaders[key] = index
+                    followers[index] = []
+                    unit_keys[index] = key
+                    unit.append(index)
+            return unit
+
+        def finish(index, result):
+            """套用一句字幕的結果；result 為 None 表示最終失敗，保留原文"""
+            nonlocal completed, failed
+            cue = buffered[index]
+            source_hash = source_hashes.pop(index)
+            if result:
+                manifest_hashes[index] = source_hash
+                if self.debug_mode:
+                    print(f"\n原始文本: {cue.text}")
+                    print(f"翻譯結果: {result}")
+                    print("-" * 50)
+                with profiler.span("journal_write"):
+                    journal.record(index, cue.text, result)
+                cue.text = result
+                self.metrics.inc("cues_translated")
+            else:
+                # 最終失敗的字幕保留原文，且不寫入日誌，下次執行會重新翻譯
+                failed += 1
+                self.metrics.inc("cues_failed")
+            ready.add(index)
+            completed += 1
+
+        def flush_ready():
+            """依序寫出已完成的字幕"""
+            nonlocal next_write
+            while next_write in ready:
+                ready.discard(next_write)
+                cue = buffered.pop(next_write)
+                source_hash = manifest_hashes.pop(next_write, None)
+                with profiler.span("write"):
+                    writer.write(cue)
+                    if source_hash is not None:
+                        # 依字幕順序寫出，清單不必在記憶體中保留整個檔案
+                        manifest.record(source_hash, cue.start, cue.end, cue.text)
+                next_write += 1
+
+        # 啟用 cProfile 時，工作執行緒中的請求與 JSON 處理也計入這個檔案的剖析
+        translate_pack = profiler.wrap_worker(self.translate_pack)
+        # 每個檔案使用獨立的執行緒池，大小與視窗一致，避免被預設執行器限制
+        with ThreadPoolExecutor(max_workers=max(1, window_size)) as executor:
+            while True:
+                while len(pending) < window_size and (requeue or (not exhausted and len(buffered) < max_buffered)):
+                    unit = read_unit()
+                    if unit:
+                        texts = [buffered[i].text for i in unit]
+                        future = loop.run_in_executor(executor, translate_pack, texts)
+                        pending[future] = unit
+                flush_ready()
+
+                if not pending:
+                    self.progress_callback(min(completed, total), total)
+                    if exhausted and not requeue:
+                        break
+                    continue
+
+                done, _ = await asyncio.wait(list(pending), return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    unit = pending.pop(future)
+                    for index, result in zip(unit, future.result()):
+                        if should_requeue(result) and attempts.get(index, 0) < MAX_REQUEUE:
+                            attempts[index] = attempts.get(index, 0) + 1
+                            requeue.append(index)
+                            continue
+                        attempts.pop(index, None)
+                        key = unit_keys.pop(index)
+                        del leaders[key]
+                        if result and len(translated_texts) < MAX_DEDUP_ENTRIES:
+                            translated_texts[key] = result
+                        finish(index, result)
+                        for follower in followers.pop(index):
+                            finish(follower, result)
+                flush_ready()
+                self.progress_callback(min(completed, total), total)
+
+        return failed
+
+    def translate_text(self, text):
+        """先查詢翻譯記憶，未命中才向模型發出請求"""
+        return self.translate_pack([text])[0]
+
+    def translate_pack(self, texts):
+        """翻譯一組連續字幕：已在翻譯記憶中的句子不再送出，其他檔案正在翻譯的相同句子等待共用結果"""
+        keys = [self._request_key(text) for text in texts]
+        results = [self._cache_get(key) for key in keys]
+        owned, shared, duplicates = [], [], []
+        calls = {}
+        first_index = {}
+        for i, result in enumerate(results):
+            if result is not None:
+                continue
+            if keys[i] in first_index:
+                # 同一組內重複的句子直接沿用
+                duplicates.append(i)
+                continue
+            first_index[keys[i]] = i
+            leader, calls[i] = self.single_flight.acquire(keys[i])
+            (owned if leader else shared).append(i)
+
+        resolved = set()
         try:
-            with urllib.request.urlopen(req) as response:
-                result = json.loads(response.read().decode('utf-8'))
-                return result['choices'][0]['message']['content'].strip()
-        except Exception:
+            if owned:
+                if self.language_batcher is not None:
+                    translated = self.language_batcher.fetch(self, [texts[i] for i in owned])
+                elif len(owned) == 1:
+                    translated = [self.fetch(texts[owned[0]])]
+                else:
+                    translated = self._fetch_packed_split([texts[i] for i in owned])
+                for i, result in zip(owned, translated):
+                    results[i] = result
+                    self._cache_put(keys[i], result)
+                    self.single_flight.resolve(keys[i], calls[i], result)
+                    resolved.add(i)
+        except BaseException as e:
+            for i in owned:
+                if i not in resolved:
+                    self.single_flight.fail(keys[i], calls[i], e)
+            raise
+
+        # 先公布自己負責的結果再等待其他檔案，避免互相等待
+        for i in shared:
+            results[i] = calls[i].wait()
+            self.metrics.inc("single_flight_shared")
+        for i in duplicates:
+            results[i] = results[first_index[keys[i]]]
+            self.metrics.inc("deduplicated")
+        return results
+
+    def _request_key(self, text):
+        """翻譯記憶與請求合併共用的鍵值：模型、提示詞、語言與正規化後的文字"""
+        if self._prompt_hash is None:
+            self._prompt_hash = hash_prompt(self._get_system_prompt())
+        return self.cache.make_key(
+            self.model_name, self._prompt_hash, self.source_lang, self.target_lang, text
+        )
+
+    def _cache_get(self, key):
+        if not self.use_cache:
+            return None
+        try:
+            with self.profiler.span("cache"):
+                result = self.cache.get(key)
+            self.metrics.inc("cache_hits" if result is not None else "cache_misses")
+            return result
+        except sqlite3.Error as e:
+            if self.debug_mode:
+                print(f"讀取翻譯快取失敗: {str(e)}")
             return None
 
+    def _cache_put(self, key, result):
+        if not self.use_cache or not result:
+            return
+        try:
+            with self.profiler.span("cache"):
+                self.cache.put(key, result)
+        except sqlite3.Error as e:
+            if self.debug_mode:
+                print(f"寫入翻譯快取失敗: {str(e)}")
+
+    def _fetch_packed_split(self, texts):
+        """打包翻譯；回覆的編號有缺漏時只重送缺少的句子，格式錯亂時拆成兩半重試。
+        請求本身失敗時不拆開重送（拆開只會放大失敗的請求數），整組回傳失敗，交由視窗重新排入"""
+        if len(texts) == 1:
+            return [self.fetch(texts[0])]
+
+        mid = len(texts) // 2
+        parsed = self.fetch_packed(texts)
+        if isinstance(parsed, RequestFailed):
+            return [parsed] * len(texts)
+        if not parsed:
+            return self._fetch_packed_split(texts[:mid]) + self._fetch_packed_split(texts[mid:])
+
+        results = [parsed.get(i + 1) for i in range(len(texts))]
+        missing = [i for i, result in enumerate(results) if not result]
+        if len(missing) == len(texts):
+            # 不重送完全相同的清單，拆成兩半避免無限重試
+            return self._fetch_packed_split(texts[:mid]) + self._fetch_packed_split(texts[mid:])
+        if missing:
+            if self.debug_mode:
+                print(f"打包回覆缺少 {len(missing)}/{len(texts)} 句，重新送出缺少的部分")
+            retried = self._fetch_packed_split([texts[i] for i in missing])
+            for i, result in zip(missing, retried):
+                results[i] = result
+        return results
+
+    def fetch_packed(self, texts):
+        """以一個請求翻譯多句編號字幕，回傳 {編號: 譯文}；
+        回覆無法對應時回傳 None，請求失敗時回傳 RequestFailed"""
+        numbered = "\n".join(
+            f"[{i}] {text.replace(chr(10), PACK_LINE_BREAK)}" for i, text in enumerate(texts, 1)
+        )
+        content = self._chat(
+            f"Translate each numbered subtitle below to {self.target_lang}.\n"
+            f"Reply with exactly {len(texts)} lines in the same \"[n] translation\" format, "
+            f"one line per subtitle, keeping the numbers. "
+            f"Line breaks inside a subtitle are written as {PACK_LINE_BREAK}; keep them.\n"
+            f"{numbered}"
+        )
+        if isinstance(content, RequestFailed):
+            return content
+        if not content:
+            return None
+        return parse_packed_reply(content, len(texts))
+
+    def fetch(self, text):
+        return self._chat(f"Translate the following text to {self.target_lang}:\n{text}")
+
+    def _chat(self, user_content):
+        """送出對話請求，可重試的錯誤會以指數退避重試；
+        最終失敗時回傳 REQUEST_FAILED，無法重試的錯誤（例如 4xx）回傳 REQUEST_REJECTED"""
+        # 系統提示詞固定在前，所有請求共用相同的前綴
+        payload = self.backend.build_payload(self.model_name, self._get_system_prompt(), user_content)
+        self.backend.wait_ready(self.model_name)
+        attempt = 0
+        while True:
+            # 後端故障時斷路器會在此暫停送出請求
+            self.circuit_breaker.wait_until_available()
+            try:
+                # 伺服器拒絕的請求（4xx）不代表壅塞，不應讓自適應並行上限縮小
+                with self.scheduler.request_slot(self.retry_policy.is_retryable):
+                    request_started = time.monotonic()
+                    try:
+                        with self.profiler.span("request"):
+                            result = get_client().post_json(
+                                self.backend.chat_path, payload, timeout=self.retry_policy.timeout
+                            )
+                    except Exception:
+                        self.metrics.observe_error()
+                        raise
+                    latency = time.monotonic() - request_started
+                content, usage = self.backend.parse_reply(result)
+                self.metrics.observe_request(latency, usage)
+                self.circuit_breaker.record_success()
+                return content
+            except Exception as e:
+                retryable = self.retry_policy.is_retryable(e)
+                if retryable:
+                    self.circuit_breaker.record_failure()
+                else:
+                    # 伺服器有回應（例如 4xx 或格式錯誤），後端本身仍可用
+                    self.circuit_breaker.record_success()
+                if not retryable or attempt >= self.retry_policy.max_retries:
+                    if self.debug_mode:
+                        print(f"請求失敗（已嘗試 {attempt + 1} 次）: {str(e)}")
+                    return REQUEST_FAILED if retryable else REQUEST_REJECTED
+                self.metrics.inc("retries")
+                time.sleep(self.retry_policy.delay(attempt))
+                attempt += 1
+
     def _get_system_prompt(self):
+        """取得系統提示詞，每個檔案只讀取一次"""
+        if self._system_prompt is None:
+            self._system_prompt = self._load_system_prompt()
+        return self._system_prompt
+
+    def _load_system_prompt(self):
         import json
         import os
 
@@ -132,17 +600,7 @@ class TranslationThread(threading.Thread):
             response = self.handle_file_conflict(base_path)
             if response == "rename":
                 # 自動重新命名，加上數字後綴
-                dir_name, file_name = os.path.split(self.file_path)
-                name, ext = os.path.splitext(file_name)
-                from src.utils.file_utils import get_language_suffix
-                lang_suffix = get_language_suffix(self.target_lang)
-                
-                counter = 1
-                while True:
-                    new_path = os.path.join(dir_name, f"{name}{lang_suffix}_{counter}{ext}")
-                    if not os.path.exists(new_path):
-                        return new_path
-                    counter += 1
+                return get_available_path(base_path)
             elif response == "skip":
                 return None
             # response == "overwrite" 則使用原始路徑
@@ -151,6 +609,9 @@ class TranslationThread(threading.Thread):
 
     def handle_file_conflict(self, file_path):
         """處理檔案衝突"""
+        if self.conflict_policy:
+            return self.conflict_policy
+
         # 使用 Queue 在線程間通信
         queue = Queue()
         
@@ -0,0 +1,102 @@
+"""
+字幕檔案掃描。
+以可設定的包含／排除樣式（fnmatch 萬用字元）篩選檔案，
+所有樣式合併成一個預先編譯的正規表示式；以 "/" 結尾的樣式比對資料夾名稱，
+符合的資料夾整個略過不會進入。
+掃描結果分批產生，呼叫端可以邊掃描邊加入清單。
+"""
+import fnmatch
+import os
+import re
+
+# 以逗號分隔的樣式，可覆寫預設值
+INCLUDE_ENV = 'SRT_TRANSLATOR_INCLUDE'
+EXCLUDE_ENV = 'SRT_TRANSLATOR_EXCLUDE'
+DEFAULT_INCLUDE = ("*.srt",)
+# 備份資料夾；已翻譯的輸出檔案另依目標語言加入排除
+DEFAULT_EXCLUDE = ("backup/",)
+# 每批回傳的檔案數
+SCAN_BATCH_SIZE = 500
+
+
+def parse_patterns(value):
+    """解析以逗號分隔的樣式清單"""
+    return tuple(pattern.strip() for pattern in (value or '').split(',') if pattern.strip())
+
+
+def output_patterns(output_suffix):
+    """目標語言的輸出檔案樣式，包含自動重新命名的 _1、_2…"""
+    return (f"*{output_suffix}.srt", f"*{output_suffix}_[0-9]*.srt")
+
+
+def _compile(patterns):
+    # 不分大小寫；全部樣式合併成一個正規表示式，每個名稱只比對一次
+    if not patterns:
+        return None
+    return re.compile("|".join(fnmatch.translate(pattern.lower()) for pattern in patterns))
+
+
+class ScanFilter:
+    """包含／排除樣式"""
+
+    def __init__(self, include=None, exclude=None):
+        self.include = tuple(include if include is not None else
+                             parse_patterns(os.environ.get(INCLUDE_ENV)) or DEFAULT_INCLUDE)
+        self.exclude = tuple(exclude if exclude is not None else
+                             parse_patterns(os.environ.get(EXCLUDE_ENV)) or DEFAULT_EXCLUDE)
+        self._include_re = _compile(self.include)
+        self._exclude_re = _compile([p for p in self.exclude if not p.endswith('/')])
+        self._exclude_dir_re = _compile([p.rstrip('/') for p in self.exclude if p.endswith('/')])
+
+    @classmethod
+    def for_target(cls, output_suffixes, include=None, exclude=None):
+        """預設樣式再加上排除目標語言的輸出檔案；output_suffixes 可為一個或多個語言後綴"""
+        if isinstance(output_suffixes, str):
+            output_suffixes = [output_suffixes]
+        scan_filter = cls(include, exclude)
+        patterns = tuple(pattern for suffix in output_suffixes for pattern in output_patterns(suffix))
+        return cls(scan_filter.include, scan_filter.exclude + patterns)
+
+    def match_file(self, name):
+        """檔名是否符合包含樣式且不符合排除樣式"""
+        return self.classify(name) is True
+
+    def classify(self, name):
+        """True 為符合，False 為被排除樣式略過，None 為不在包含樣式內"""
+        name = name.lower()
+        if self._include_re is None or not self._include_re.match(name):
+            return None
+        return self._exclude_re is None or not self._exclude_re.match(name)
+
+    def match_dir(self, name):
+        """資料夾是否需要進入"""
+        return self._exclude_dir_re is None or not self._exclude_dir_re.match(name.lower())
+
+
+def scan_folder(root, scan_filter, batch_size=SCAN_BATCH_SIZE, stats=None, sort=False):
+    """遞迴掃描資料夾，分批產生符合樣式的檔案路徑；
+    stats 累計 matched、excluded（被排除的檔案）與 excluded_dirs 數量"""
+    if stats is None:
+        stats = {}
+    for key in ("matched", "excluded", "excluded_dirs"):
+        stats.setdefault(key, 0)
+    batch = []
+    for current, dirs, files in os.walk(root):
+        # 直接修改 dirs，os.walk 就不會進入被排除的資料夾
+        kept = [d for d in dirs if scan_filter.match_dir(d)]
+        stats["excluded_dirs"] += len(dirs) - len(kept)
+        dirs[:] = sorted(kept) if sort else kept
+        for name in (sorted(files) if sort else files):
+            matched = scan_filter.classify(name)
+            if matched is None:
+                continue
+            if not matched:
+                stats["excluded"] += 1
+                continue
+            stats["matched"] += 1
+            batch.append(os.path.join(current, name))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
@@ -1,67 +1,88 @@
 import os
 import re
 import shutil
-import pysrt
+import sys
+import threading
+
+from src.utils.srt_cleaner import SrtCleaner, DEFAULT_RULES
+
+# ioctl FICLONE（Linux 上 Btrfs、XFS 等支援寫入時複製的檔案系統）
+FICLONE = 0x40049409
+
 
 def ensure_backup_dir(backup_path):
     """確保備份目錄存在"""
-    if not os.path.exists(backup_path):
-        os.makedirs(backup_path)
-
-def clean_srt_file(input_file, create_backup=False):
-    """清理 SRT 檔案，移除不需要的字幕，重新排序字幕編號"""
-    result = {
-        "cleaned": 0,
-        "total": 0
-    }
-    
+    os.makedirs(backup_path, exist_ok=True)
+
+
+def _reflink(source, target):
+    """以寫入時複製的方式複製檔案，不複製資料區塊"""
+    if not sys.platform.startswith('linux'):
+        raise OSError("reflink 只支援 Linux")
+    import fcntl
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    shutil.copystat(source, target)
+
+
+def backup_file(file_path):
+    """備份到同目錄的 backup 資料夾，回傳 (備份路徑, 方式)。
+    依序嘗試 reflink、hardlink，都不支援時才複製。
+    hardlink 可以安全使用，因為原始檔案一律以暫存檔取代（atomic_open），不會就地改寫。"""
+    backup_path = os.path.join(os.path.dirname(file_path), 'backup')
+    ensure_backup_dir(backup_path)
+    backup = os.path.join(backup_path, os.path.basename(file_path))
+    # 先建立在暫存名稱，成功後才取代舊的備份
+    temp = os.path.join(backup_path, f".{os.path.basename(file_path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+    for method, create in (("reflink", _reflink), ("hardlink", os.link), ("copy", shutil.copy2)):
+        try:
+            if os.path.lexists(temp):
+                os.remove(temp)
+            create(file_path, temp)
+        except (OSError, NotImplementedError):
+            if method == "copy":
+                raise
+            continue
+        try:
+            os.replace(temp, backup)
+        finally:
+            if os.path.lexists(temp):
+                os.remove(temp)
+        return backup, method
+
+
+def clean_srt_file(input_file, create_backup=False, rules=DEFAULT_RULES):
+    """清理 SRT 檔案，移除不需要的字幕，重新排序字幕編號
+
+    回傳 {"total": 原句數, "cleaned": 保留句數, "removed": 移除句數, "rules": {規則: 影響句數}}
+    """
     try:
         # 如果需要創建備份
         if create_backup:
-            backup_path = os.path.join(os.path.dirname(input_file), 'backup')
-            ensure_backup_dir(backup_path)
-            backup_file = os.path.join(backup_path, os.path.basename(input_file))
-            shutil.copy2(input_file, backup_file)
-        
-        with open(input_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        new_lines = []
-        current_subtitle = []
-        subtitle_number = 1
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                if current_subtitle:
-                    result["total"] += 1
-                    if len(current_subtitle) >= 3 and not re.match(r'^\(\s*[^)]*\s*\)$', current_subtitle[2]):
-                        current_subtitle[0] = str(subtitle_number)
-                        new_lines.extend(current_subtitle)
-                        new_lines.append('')
-                        subtitle_number += 1
-                        result["cleaned"] += 1
-                    current_subtitle = []
-            else:
-                current_subtitle.append(line)
-        
-        # 處理最後一個字幕
-        if current_subtitle:
-            result["total"] += 1
-            if not re.match(r'^\(\s*[^)]*\s*\)$', current_subtitle[2]):
-                current_subtitle[0] = str(subtitle_number)
-                new_lines.extend(current_subtitle)
-                result["cleaned"] += 1
-        
-        # 寫回原始檔案
-        with open(input_file, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(new_lines))
-        
-        return result
-        
+            backup_file(input_file)
+
+        return SrtCleaner(rules).clean_file(input_file)
+
     except Exception as e:
         raise Exception(f"處理檔案時發生錯誤: {str(e)}")
 
+
+def get_available_path(path):
+    """path 已存在時使用的新名稱：同目錄下第一個未使用的 name_1.ext、name_2.ext…
+    只列出一次目錄，不逐一檢查每個編號"""
+    dir_name, file_name = os.path.split(path)
+    name, ext = os.path.splitext(file_name)
+    numbered = re.compile(re.escape(os.path.normcase(name)) + r'_(\d+)' + re.escape(os.path.normcase(ext)) + '$')
+    used = set()
+    for entry in os.listdir(dir_name or '.'):
+        match = numbered.match(os.path.normcase(entry))
+        if match:
+            used.add(int(match.group(1)))
+    counter = 1
+    while counter in used:
+        counter += 1
+    return os.path.join(dir_name, f"{name}_{counter}{ext}")
+
 def get_language_suffix(language):
     """根據語言名稱獲取檔案後綴"""
     lang_suffix = {
@@ -0,0 +1,377 @@
+"""
+監看資料夾，自動找出新增或變更的字幕檔案。
+Linux 上以 ctypes 呼叫 inotify，其他平台（或 inotify 無法使用時）改為輪詢：
+只重新列出修改時間有變動的資料夾，並比對已知檔案的 (mtime, size)。
+檔案大小與修改時間在 settle 秒內都沒有變化才視為寫入完成，避免處理寫到一半的檔案。
+刪除或移走的檔案與資料夾也會回報，以便清除已交出檔案的紀錄。
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# 檔案在這段時間（秒）內沒有變化才視為寫入完成
+DEFAULT_SETTLE = 2.0
+# 輪詢模式的掃描間隔（秒）
+DEFAULT_POLL_INTERVAL = 2.0
+# 檢查待定檔案的間隔（秒）
+TICK = 0.5
+# 記住已交出檔案簽章的數量上限，超過時淘汰最久未變動的
+MAX_SEEN = 100000
+
+# inotify 事件旗標（見 <sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF)
+_EVENT = struct.Struct("iIII")
+
+
+def _signature(path):
+    """檔案的 (mtime_ns, size)，檔案不存在時回傳 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _walk(root, scan_filter):
+    """產生 (資料夾, 子資料夾, 符合樣式的檔案)，略過被排除的資料夾"""
+    for current, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if scan_filter.match_dir(d)]
+        yield current, dirs, [os.path.join(current, name) for name in files if scan_filter.match_file(name)]
+
+
+class InotifyBackend:
+    """以 inotify 監看整個目錄樹"""
+
+    name = "inotify"
+
+    def __init__(self, scan_filter):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify 只支援 Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._fd = libc.inotify_init1(IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.scan_filter = scan_filter
+        self._roots = []
+        self._watches = {}
+
+    def start(self, roots):
+        """開始監看並回傳目前已存在的檔案"""
+        self._roots = list(roots)
+        files = []
+        for root in self._roots:
+            files.extend(self._watch_tree(root))
+        return files
+
+    def _watch_tree(self, root):
+        files = []
+        for current, dirs, matched in _walk(root, self.scan_filter):
+            wd = self._add_watch(self._fd, os.fsencode(current), WATCH_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                # 超過 max_user_watches 等錯誤由呼叫端改用輪詢
+                raise OSError(errno, f"無法監看 {current}: {os.strerror(errno)}")
+            self._watches[wd] = current
+            files.extend(matched)
+        return files
+
+    def poll(self, timeout):
+        """等待事件，回傳可能有變動（或已刪除、移走）的檔案與資料夾"""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        data = os.read(self._fd, 64 * 1024)
+        changed = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # 事件遺失時重新掃描全部
+                return self.rescan()
+            directory = self._watches.get(wd)
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and self.scan_filter.match_dir(name):
+                    # 新資料夾：加入監看，並找出建立監看之前就已寫入的檔案
+                    changed.extend(self._watch_tree(path))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    changed.append(path)
+            elif self.scan_filter.match_file(name):
+                changed.append(path)
+        return changed
+
+    def rescan(self):
+        files = []
+        for root in self._roots:
+            files.extend(self._watch_tree(root))
+        return files
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingBackend:
+    """以資料夾修改時間為索引的輪詢"""
+
+    name = "polling"
+
+    def __init__(self, scan_filter, interval=DEFAULT_POLL_INTERVAL):
+        self.scan_filter = scan_filter
+        self.interval = interval
+        self._dirs = {}
+        self._files = {}
+        self._next_poll = 0.0
+
+    def start(self, roots):
+        self._next_poll = time.monotonic() + self.interval
+        files = []
+        for root in roots:
+            files.extend(self._index_tree(root))
+        return files
+
+    def _index_tree(self, root):
+        files = []
+        for current, dirs, matched in _walk(root, self.scan_filter):
+            try:
+                self._dirs[current] = os.stat(current).st_mtime_ns
+            except OSError:
+                continue
+            for path in matched:
+                self._files[path] = _signature(path)
+            files.extend(matched)
+        return files
+
+    def poll(self, timeout):
+        delay = self._next_poll - time.monotonic()
+        if delay > 0:
+            time.sleep(min(delay, timeout))
+            if time.monotonic() < self._next_poll:
+                return []
+        self._next_poll = time.monotonic() + self.interval
+        changed = []
+        # 資料夾的修改時間只在新增、刪除或改名時變動，只需重新列出這些資料夾
+        for directory, mtime in list(self._dirs.items()):
+            try:
+                current = os.stat(directory).st_mtime_ns
+            except OSError:
+                self._forget(directory)
+                changed.append(directory)
+                continue
+            if current != mtime:
+                self._dirs[directory] = current
+                changed.extend(self._rescan_dir(directory))
+        # 檔案內容的變更不會更新資料夾的修改時間，逐一比對已知檔案
+        for path, signature in list(self._files.items()):
+            current = _signature(path)
+            if current is None:
+                del self._files[path]
+                changed.append(path)
+            elif current != signature:
+                self._files[path] = current
+                changed.append(path)
+        return changed
+
+    def _rescan_dir(self, directory):
+        changed = []
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return changed
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            if is_dir:
+                if entry.path not in self._dirs and self.scan_filter.match_dir(entry.name):
+                    changed.extend(self._index_tree(entry.path))
+            elif entry.path not in self._files and self.scan_filter.match_file(entry.name):
+                self._files[entry.path] = _signature(entry.path)
+                changed.append(entry.path)
+        return changed
+
+    def _forget(self, directory):
+        prefix = directory + os.sep
+        for path in [d for d in self._dirs if d == directory or d.startswith(prefix)]:
+            del self._dirs[path]
+        for path in [f for f in self._files if f.startswith(prefix)]:
+            del self._files[path]
+
+    def close(self):
+        pass
+
+
+class FolderWatcher:
+    """監看資料夾，把寫入完成的新檔案或變更的檔案交給 on_file(path, initial)。
+    on_file 回傳 True 表示已排入翻譯，完成後必須呼叫 mark_done(path)。"""
+
+    def __init__(self, roots, scan_filter, on_file, settle=DEFAULT_SETTLE,
+                 poll_interval=DEFAULT_POLL_INTERVAL, use_inotify=True):
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.scan_filter = scan_filter
+        self.on_file = on_file
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.backend = None
+        if use_inotify:
+            try:
+                self.backend = InotifyBackend(scan_filter)
+            except (OSError, AttributeError):
+                self.backend = None
+        if self.backend is None:
+            self.backend = PollingBackend(scan_filter, poll_interval)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        # path -> [簽章, 簽章開始不變的時間, 是否為啟動時已存在的檔案]
+        self._pending = {}
+        # 已交出的檔案及其簽章；相同簽章不會重複交出。
+        # 檔案刪除或移走時清除，並以 MAX_SEEN 為上限淘汰最久未變動的
+        self._seen = OrderedDict()
+        self._in_flight = set()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def mark_done(self, path, rewritten=False):
+        """翻譯完成；rewritten 表示原始檔案被改寫（取代原始檔案模式），不應再次觸發"""
+        with self._lock:
+            self._in_flight.discard(path)
+            if rewritten:
+                self._remember(path, _signature(path))
+
+    def _remember(self, path, signature):
+        """記住交出的簽章，呼叫端需持有 _lock"""
+        self._seen[path] = signature
+        self._seen.move_to_end(path)
+        while len(self._seen) > MAX_SEEN:
+            self._seen.popitem(last=False)
+
+    def _forget(self, path):
+        """檔案或資料夾已刪除、移走：清除待定與已交出的紀錄"""
+        known = self._pending.pop(path, None) is not None
+        with self._lock:
+            if self._seen.pop(path, None) is not None or known:
+                return
+            # 不是已知的檔案時可能是資料夾，清除其下所有紀錄
+            prefix = path + os.sep
+            for key in [p for p in self._seen if p.startswith(prefix)]:
+                del self._seen[key]
+        for key in [p for p in self._pending if p.startswith(prefix)]:
+            del self._pending[key]
+
+    def run(self):
+        try:
+            initial = self._start_backend()
+        except OSError as e:
+            # 例如 inotify 監看數量不足，改用輪詢
+            print(f"{self.backend.name} 無法使用（{str(e)}），改用輪詢")
+            self.backend.close()
+            self.backend = PollingBackend(self.scan_filter, self.poll_interval)
+            initial = self._start_backend()
+        self._add_pending(initial, initial=True)
+        try:
+            while not self._stop.is_set():
+                try:
+                    changed = self.backend.poll(TICK)
+                except OSError as e:
+                    print(f"監看資料夾時發生錯誤: {str(e)}")
+                    self._stop.wait(TICK)
+                    continue
+                self._add_pending(changed)
+                self._flush_settled()
+        finally:
+            self.backend.close()
+
+    def _start_backend(self):
+        for root in self.roots:
+            if not os.path.isdir(root):
+                raise FileNotFoundError(f"找不到資料夾: {root}")
+        return self.backend.start(self.roots)
+
+    def _add_pending(self, paths, initial=False):
+        now = time.monotonic()
+        for path in paths:
+            signature = _signature(path)
+            if signature is None:
+                self._forget(path)
+                continue
+            entry = self._pending.get(path)
+            if entry is None:
+                self._pending[path] = [signature, now, initial]
+            elif entry[0] != signature:
+                entry[0] = signature
+                entry[1] = now
+
+    def _flush_settled(self):
+        now = time.monotonic()
+        ready = []
+        for path, entry in list(self._pending.items()):
+            signature = _signature(path)
+            if signature is None:
+                self._forget(path)
+                continue
+            if signature != entry[0]:
+                # 仍在寫入，重新計時
+                entry[0] = signature
+                entry[1] = now
+                continue
+            if now - entry[1] < self.settle:
+                continue
+            with self._lock:
+                if path in self._in_flight:
+                    # 等這次翻譯完成後再判斷
+                    continue
+                del self._pending[path]
+                if self._seen.get(path) == signature:
+                    continue
+                self._remember(path, signature)
+                self._in_flight.add(path)
+            ready.append((path, entry[2]))
+        for path, initial in ready:
+            try:
+                queued = self.on_file(path, initial)
+            except Exception as e:
+                print(f"無法排入 {path}: {str(e)}")
+                queued = False
+            if not queued:
+                self.mark_done(path)
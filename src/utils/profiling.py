@@ -0,0 +1,265 @@
+"""
+選用的效能剖析。
+以計時區段記錄各階段（解析、清理、請求、寫出等）的耗時，
+可選擇對每個檔案執行 cProfile（包含該檔案送出請求的工作執行緒），或以 tracemalloc 找出配置最多記憶體的程式行，
+結束時輸出每次執行的報告。未啟用時區段不做任何事。
+
+啟用方式：環境變數 SRT_TRANSLATOR_PROFILE=spans,cprofile,tracemalloc（任選），
+或命令列的 --profile 選項。
+"""
+import io
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from src.utils.srt_stream import atomic_open
+
+PROFILE_ENV = 'SRT_TRANSLATOR_PROFILE'
+PROFILE_DIR_ENV = 'SRT_TRANSLATOR_PROFILE_DIR'
+DEFAULT_PROFILE_DIR = os.path.join(os.path.expanduser('~'), '.srt_translator', 'profiles')
+PROFILE_MODES = ('spans', 'cprofile', 'tracemalloc')
+# 報告中列出的函式與記憶體配置數量
+TOP_N = 20
+
+_NULL_SPAN = nullcontext()
+# Python 3.12 起 cProfile 以 sys.monitoring 實作，整個程式同一時間只能啟用一個 Profile，
+# 工作執行緒無法各自剖析，同時處理的其他檔案也只記錄區段
+_SINGLE_PROFILER = sys.version_info >= (3, 12)
+_PROFILER_BUSY = "另一個剖析工具正在執行，此檔案只記錄區段"
+
+
+class _FileProfile:
+    """一個檔案的 cProfile：驅動執行緒與每個工作執行緒各用一個 Profile，結束時合併"""
+
+    def __init__(self):
+        import cProfile
+        self.main = cProfile.Profile()
+        self.workers = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def wrap(self, func):
+        def run(*args, **kwargs):
+            profile = getattr(self._local, 'profile', None)
+            if profile is None:
+                import cProfile
+                profile = self._local.profile = cProfile.Profile()
+                with self._lock:
+                    self.workers.append(profile)
+            try:
+                profile.enable()
+            except ValueError:
+                # 其他剖析工具已在執行
+                return func(*args, **kwargs)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.disable()
+        return run
+
+    def stats(self, stream):
+        import pstats
+        stats = pstats.Stats(self.main, stream=stream)
+        with self._lock:
+            workers = list(self.workers)
+        for profile in workers:
+            try:
+                stats.add(profile)
+            except TypeError:
+                # 沒有收集到任何呼叫的 Profile
+                pass
+        return stats
+
+
+def parse_modes(value):
+    """解析以逗號分隔的剖析模式，"1" 視為只記錄區段"""
+    modes = {mode.strip().lower() for mode in (value or '').split(',') if mode.strip()}
+    if modes & {'1', 'true', 'yes', 'on'}:
+        modes = (modes - {'1', 'true', 'yes', 'on'}) | {'spans'}
+    unknown = modes - set(PROFILE_MODES)
+    if unknown:
+        raise ValueError(f"未知的剖析模式: {', '.join(sorted(unknown))}")
+    return modes
+
+
+class Profiler:
+    """收集計時區段與每個檔案的剖析結果"""
+
+    def __init__(self, modes=(), report_dir=None):
+        self._lock = threading.Lock()
+        # 目前執行緒正在剖析的檔案（供 wrap_worker 使用）
+        self._local = threading.local()
+        self.configure(modes, report_dir)
+
+    def configure(self, modes=(), report_dir=None):
+        modes = set(modes)
+        # cProfile 與 tracemalloc 都附帶區段計時
+        self.enabled = bool(modes)
+        self.use_cprofile = 'cprofile' in modes
+        self.use_tracemalloc = 'tracemalloc' in modes
+        self.report_dir = report_dir or os.environ.get(PROFILE_DIR_ENV) or DEFAULT_PROFILE_DIR
+        if self.use_tracemalloc:
+            # cProfile、pstats 與 tracemalloc 只在啟用對應模式時才載入，不拖慢程式啟動
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+        self.reset()
+
+    def reset(self):
+        """開始新的一次執行"""
+        with self._lock:
+            self.stages = {}
+            self.files = []
+            self.started = time.time()
+
+    def span(self, name):
+        """計時區段；未啟用時回傳不做事的 context manager"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name)
+
+    @contextmanager
+    def _span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        """累加一個階段的耗時"""
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = {"count": 0, "total": 0.0, "max": 0.0}
+            stage["count"] += 1
+            stage["total"] += seconds
+            stage["max"] = max(stage["max"], seconds)
+
+    @contextmanager
+    def profile_file(self, file_path):
+        """記錄單一檔案的耗時；啟用 cProfile 時剖析此執行緒，以及經 wrap_worker 包裝的工作執行緒呼叫"""
+        if not self.enabled:
+            yield
+            return
+        profile = _FileProfile() if self.use_cprofile else None
+        skipped = None
+        start = time.perf_counter()
+        if profile is not None:
+            try:
+                profile.main.enable()
+            except ValueError:
+                # Python 3.12 起其他檔案（或其他工具）正在剖析時無法啟用，改為只記錄區段
+                profile = None
+                skipped = _PROFILER_BUSY
+            else:
+                self._local.file_profile = profile
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.main.disable()
+                self._local.file_profile = None
+            entry = {"file": file_path, "seconds": time.perf_counter() - start}
+            if profile is not None:
+                entry.update(self._save_profile(profile, file_path))
+            elif skipped:
+                entry["cprofile_skipped"] = skipped
+            with self._lock:
+                self.files.append(entry)
+
+    def wrap_worker(self, func):
+        """包裝要交給工作執行緒的函式，讓其呼叫計入目前檔案的 cProfile；
+        未剖析或 Python 3.12 以上（無法另外啟用 Profile）時原樣回傳"""
+        profile = getattr(self._local, 'file_profile', None)
+        return func if profile is None or _SINGLE_PROFILER else profile.wrap(func)
+
+    def _save_profile(self, profile, file_path):
+        """合併各執行緒的結果，保存 .prof 檔案並摘錄累計耗時最高的函式"""
+        os.makedirs(self._run_dir(), exist_ok=True)
+        name = os.path.splitext(os.path.basename(file_path))[0]
+        prof_path = os.path.join(self._run_dir(), f"{name}-{threading.get_ident()}.prof")
+        output = io.StringIO()
+        stats = profile.stats(output)
+        stats.dump_stats(prof_path)
+        stats.sort_stats('cumulative').print_stats(TOP_N)
+        return {"cprofile": prof_path, "cprofile_top": output.getvalue()}
+
+    def _run_dir(self):
+        return os.path.join(self.report_dir, time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started)))
+
+    def report(self):
+        """目前的剖析結果"""
+        with self._lock:
+            stages = {
+                name: dict(stage, mean=stage["total"] / stage["count"])
+                for name, stage in sorted(self.stages.items(), key=lambda item: -item[1]["total"])
+            }
+            files = list(self.files)
+        data = {"wall_time": time.time() - self.started, "stages": stages, "files": files}
+        if self.use_tracemalloc:
+            import cProfile
+            import pstats
+            import tracemalloc
+        if self.use_tracemalloc and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # 排除剖析工具本身與模組載入的配置
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, path)
+                for path in (tracemalloc.__file__, cProfile.__file__, pstats.__file__, "<frozen importlib.*>")
+            ])
+            data["traced_memory"] = {"current": current, "peak": peak}
+            data["top_allocators"] = [
+                {"location": str(stat.traceback), "size": stat.size, "count": stat.count}
+                for stat in snapshot.statistics('lineno')[:TOP_N]
+            ]
+        return data
+
+    def format_report(self, data):
+        """可閱讀的階段耗時表"""
+        lines = [f"執行時間 {data['wall_time']:.2f}s（各階段為所有執行緒的累計時間）",
+                 f"{'階段':<16}{'次數':>8}{'總計(s)':>12}{'平均(ms)':>12}{'最長(ms)':>12}"]
+        for name, stage in data["stages"].items():
+            lines.append(f"{name:<16}{stage['count']:>8}{stage['total']:>12.3f}"
+                         f"{stage['mean'] * 1000:>12.2f}{stage['max'] * 1000:>12.2f}")
+        skipped = sum(1 for entry in data["files"] if entry.get("cprofile_skipped"))
+        if skipped:
+            lines.append(f"cProfile 略過 {skipped} 個檔案（另一個剖析工具正在執行，可用 --parallel-files 1）")
+        for allocator in data.get("top_allocators", [])[:5]:
+            lines.append(f"記憶體 {allocator['size'] / 1024:.1f} KiB: {allocator['location']}")
+        return "\n".join(lines)
+
+    def write_report(self, data=None):
+        """寫出本次執行的報告，回傳報告路徑；未啟用時回傳 None"""
+        if not self.enabled:
+            return None
+        data = data or self.report()
+        run_dir = self._run_dir()
+        os.makedirs(run_dir, exist_ok=True)
+        path = os.path.join(run_dir, 'report.json')
+        with atomic_open(path) as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        with atomic_open(os.path.join(run_dir, 'report.txt')) as f:
+            f.write(self.format_report(data) + "\n")
+        return path
+
+
+_default_profiler = None
+_default_lock = threading.Lock()
+
+
+def get_profiler():
+    """取得程式共用的剖析器（預設依環境變數 SRT_TRANSLATOR_PROFILE 啟用）"""
+    global _default_profiler
+    with _default_lock:
+        if _default_profiler is None:
+            try:
+                modes = parse_modes(os.environ.get(PROFILE_ENV))
+            except ValueError as e:
+                print(f"警告：{str(e)}，已停用效能剖析")
+                modes = set()
+            _default_profiler = Profiler(modes)
+        return _default_profiler
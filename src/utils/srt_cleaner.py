@@ -0,0 +1,169 @@
+"""
+字幕清理規則引擎。
+所有逐行規則合併成一個預先編譯的正規表示式，每行只掃描一次；
+逐句讀取、逐句寫出，並統計每條規則影響的字幕數。
+多個檔案可交給行程池平行處理，不佔用 GUI 主執行緒。
+"""
+import os
+import re
+
+from src.utils.srt_stream import detect_encoding, iter_cues, SrtWriter
+
+# 逐行規則：符合的片段會被移除
+LINE_RULES = {
+    # 說話者標記，例如 "JOHN: ..."、"- Mary: ..."、"（田中）..."
+    "speaker_tags": r"^(?:-\s*)?(?:[A-Z][A-Z0-9 .'-]{0,29}:\s*|[A-Z][a-z]+:\s+|[（(][^()（）]{1,20}[)）](?=\S))",
+    # HTML 標籤，例如 <i>、</font>
+    "html_tags": r"</?[A-Za-z][^>]*>",
+    # ASS/SSA 覆寫標籤，例如 {\an8}、{\pos(10,20)}
+    "ass_tags": r"\{\\[^}]*\}",
+    # 括號內的音效與旁白，例如 (笑)、[DOOR SLAMS]、【拍手】
+    "sound_effects": r"[(（][^()（）]*[)）]|\[[^\[\]]*\]|【[^【】]*】",
+}
+# 整句規則：sound_effect_cues 移除每一行都只有一組半形括號的字幕，例如 "(laughs)"，
+# 與舊版清理的條件相同，但舊版只檢查第一行；[]、【】等其他括號需啟用 sound_effects 並搭配 empty_cues
+CUE_RULES = ("sound_effect_cues", "empty_cues", "duplicates")
+RULES = tuple(LINE_RULES) + CUE_RULES
+# 預設只移除整句音效與空白字幕；格式標籤、行內括號、說話者標記與合併重複字幕需自行啟用，避免改動對白
+DEFAULT_RULES = ("sound_effect_cues", "empty_cues")
+# 與上一句文字相同且間隔不超過此毫秒數的字幕會合併
+DUPLICATE_MAX_GAP_MS = 1000
+
+_SPACES_RE = re.compile(r"[ \t　]{2,}")
+# 整行只有一組半形括號（舊版清理的 ^\(\s*[^)]*\s*\)$）
+_SOUND_LINE_RE = re.compile(r"\s*\([^)]*\)\s*")
+
+
+class SrtCleaner:
+    """依選定的規則清理字幕"""
+
+    def __init__(self, rules=DEFAULT_RULES):
+        unknown = set(rules) - set(RULES)
+        if unknown:
+            raise ValueError(f"未知的清理規則: {', '.join(sorted(unknown))}")
+        self.rules = tuple(rule for rule in RULES if rule in rules)
+        line_rules = [rule for rule in self.rules if rule in LINE_RULES]
+        self._pattern = re.compile(
+            "|".join(f"(?P<{rule}>{LINE_RULES[rule]})" for rule in line_rules)
+        ) if line_rules else None
+
+    def clean_text(self, text):
+        """清理一句字幕的文字，回傳 (新文字, 符合的規則集合)"""
+        hits = set()
+        if self._pattern is None:
+            return text, hits
+
+        def remove(match):
+            hits.add(match.lastgroup)
+            return ""
+
+        lines = []
+        for line in text.split("\n"):
+            cleaned = self._pattern.sub(remove, line)
+            if cleaned != line:
+                cleaned = _SPACES_RE.sub(" ", cleaned).strip()
+                if not cleaned:
+                    continue
+            lines.append(cleaned)
+        return "\n".join(lines), hits
+
+    def clean_cues(self, cues, stats):
+        """逐句清理，產生要保留的字幕；stats 累計每條規則影響的字幕數"""
+        drop_sound_effects = "sound_effect_cues" in self.rules
+        drop_empty = "empty_cues" in self.rules
+        merge_duplicates = "duplicates" in self.rules
+        previous = None
+        for cue in cues:
+            stats["total"] += 1
+            text, hits = self.clean_text(cue.text)
+            for rule in hits:
+                stats["rules"][rule] += 1
+            cue.text = text
+            if drop_sound_effects and text.strip() and all(
+                    _SOUND_LINE_RE.fullmatch(line) for line in text.split("\n") if line.strip()):
+                stats["rules"]["sound_effect_cues"] += 1
+                continue
+            if drop_empty and not text.strip():
+                stats["rules"]["empty_cues"] += 1
+                continue
+            if (merge_duplicates and previous is not None and text == previous.text
+                    and cue.start - previous.end <= DUPLICATE_MAX_GAP_MS):
+                # 連續重複的字幕併入上一句，延長顯示時間
+                previous.end = max(previous.end, cue.end)
+                stats["rules"]["duplicates"] += 1
+                continue
+            if previous is not None:
+                yield previous
+            previous = cue
+        if previous is not None:
+            yield previous
+
+    def clean_file(self, input_file, output_file=None):
+        """清理檔案並重新編號，output_file 預設為原檔；回傳統計。
+        無法解碼的檔案拋出 UnicodeDecodeError；就地清理且沒有任何規則生效時不改寫檔案"""
+        stats = {"total": 0, "cleaned": 0, "rules": {rule: 0 for rule in self.rules}}
+        encoding = detect_encoding(input_file)
+        # 先寫入同目錄的暫存檔，完成後才取代，因此可以直接覆寫正在讀取的檔案；
+        # 解碼失敗時暫存檔會被刪除，原始檔案不受影響
+        with SrtWriter(output_file or input_file, encoding) as writer:
+            for cue in self.clean_cues(iter_cues(input_file, encoding), stats):
+                writer.write(cue)
+            if output_file is None and not any(stats["rules"].values()):
+                writer.discard()
+        stats["cleaned"] = writer.count
+        stats["removed"] = stats["total"] - stats["cleaned"]
+        return stats
+
+
+def _clean_one(input_file, create_backup, rules):
+    """行程池中執行的工作"""
+    from src.utils.file_utils import clean_srt_file
+    return clean_srt_file(input_file, create_backup, rules)
+
+
+def clean_files(paths, create_backup=False, rules=DEFAULT_RULES, max_workers=None):
+    """平行清理多個檔案，依完成順序產生 (路徑, 統計, 例外)"""
+    paths = list(paths)
+    rules = tuple(rules)
+    if len(paths) <= 1:
+        for path in paths:
+            try:
+                yield path, _clean_one(path, create_backup, rules), None
+            except Exception as e:
+                yield path, None, e
+        return
+
+    # 清理為 CPU 密集工作，使用行程池避開 GIL；multiprocessing 載入較慢，需要時才匯入
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(paths)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_clean_one, path, create_backup, rules): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+
+
+def parse_rules(value):
+    """解析以逗號分隔的規則清單"""
+    rules = tuple(rule.strip() for rule in (value or '').split(',') if rule.strip())
+    unknown = set(rules) - set(RULES)
+    if unknown:
+        raise ValueError(f"未知的清理規則: {', '.join(sorted(unknown))}")
+    return rules
+
+
+def merge_stats(total, stats):
+    """累加單一檔案的統計到總計"""
+    for key in ("total", "cleaned", "removed"):
+        total[key] = total.get(key, 0) + stats.get(key, 0)
+    rules = total.setdefault("rules", {})
+    for rule, count in stats.get("rules", {}).items():
+        rules[rule] = rules.get(rule, 0) + count
+    return total
+
+
+def format_rule_stats(rules):
+    """以 "規則 數量" 的形式列出有作用的規則"""
+    return ", ".join(f"{rule} {count}" for rule, count in rules.items() if count)
@@ -0,0 +1,267 @@
+"""
+串流式 SRT 讀寫工具。
+以產生器逐句解析字幕，並以暫存檔逐步寫出、完成後再原子性地取代目標檔案，
+處理大型字幕檔時記憶體用量維持固定。
+需要重複走訪同一個檔案時（例如多個目標語言），以 CueTable 的陣列保存整個檔案。
+"""
+import codecs
+from array import array
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+
+_TIMING_RE = re.compile(
+    r'^\s*(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})\s*-->\s*(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})(.*)$'
+)
+
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+class SrtCue:
+    """一句字幕，時間以毫秒整數表示"""
+    __slots__ = ('index', 'start', 'end', 'text', 'position')
+
+    def __init__(self, index, start, end, text, position=''):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.text = text
+        self.position = position
+
+    def __repr__(self):
+        return f"SrtCue({self.index}, {format_timestamp(self.start)}, {format_timestamp(self.end)}, {self.text!r})"
+
+
+def _to_ms(hours, minutes, seconds, millis):
+    return ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(millis.ljust(3, '0'))
+
+
+def format_timestamp(ms):
+    """毫秒轉為 SRT 時間格式 HH:MM:SS,mmm"""
+    seconds, millis = divmod(max(0, int(ms)), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{millis:03d}"
+
+
+def detect_encoding(path, default='utf-8'):
+    """依 BOM 判斷檔案編碼，沒有 BOM 時使用預設編碼"""
+    with open(path, 'rb') as f:
+        head = f.read(4)
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    return default
+
+
+def open_srt(path, encoding=None):
+    """以正確的編碼開啟字幕檔；無法解碼時拋出 UnicodeDecodeError，
+    不以替代字元繼續，避免改寫原始檔案時破壞內容"""
+    encoding = encoding or detect_encoding(path)
+    return open(path, 'r', encoding=encoding, newline=None)
+
+
+def iter_cues(path, encoding=None):
+    """逐句讀取字幕，不會一次載入整個檔案"""
+    with open_srt(path, encoding) as f:
+        yield from parse_cues(f)
+
+
+def parse_cues(lines):
+    """從任意行迭代器解析字幕，略過格式錯誤的區塊"""
+    block = []
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if line.strip():
+            block.append(line)
+            continue
+        if block:
+            cue = _parse_block(block)
+            block = []
+            if cue is not None:
+                yield cue
+    if block:
+        cue = _parse_block(block)
+        if cue is not None:
+            yield cue
+
+
+def _parse_block(block):
+    # 序號行可省略，時間行可能是第一或第二行
+    for offset in (1, 0):
+        if offset < len(block):
+            match = _TIMING_RE.match(block[offset])
+            if match:
+                break
+    else:
+        return None
+    index = block[0].strip() if offset == 1 else ''
+    groups = match.groups()
+    return SrtCue(
+        int(index) if index.isdigit() else 0,
+        _to_ms(*groups[0:4]),
+        _to_ms(*groups[4:8]),
+        '\n'.join(block[offset + 1:]),
+        groups[8].rstrip()
+    )
+
+
+class CueTable:
+    """以陣列保存的整個檔案字幕：序號與時間為整數陣列，文字與位置存在去重的字串表，
+    走訪時才逐句產生 SrtCue；只在檔案處理中時建立"""
+
+    def __init__(self):
+        self.indexes = array('q')
+        self.starts = array('q')
+        self.ends = array('q')
+        self.text_ids = array('l')
+        self.position_ids = array('l')
+        self.strings = []
+
+    @classmethod
+    def from_cues(cls, cues):
+        table = cls()
+        ids = {}
+
+        def string_id(value):
+            number = ids.get(value)
+            if number is None:
+                number = ids[value] = len(table.strings)
+                table.strings.append(value)
+            return number
+
+        for cue in cues:
+            table.indexes.append(cue.index)
+            table.starts.append(cue.start)
+            table.ends.append(cue.end)
+            table.text_ids.append(string_id(cue.text))
+            table.position_ids.append(string_id(cue.position))
+        return table
+
+    @classmethod
+    def load(cls, path, encoding=None):
+        """解析字幕檔一次並存入陣列"""
+        return cls.from_cues(iter_cues(path, encoding))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def cue(self, i):
+        """第 i 句字幕（新的 SrtCue，可自由修改）"""
+        return SrtCue(self.indexes[i], self.starts[i], self.ends[i],
+                      self.strings[self.text_ids[i]], self.strings[self.position_ids[i]])
+
+    def __iter__(self):
+        for i in range(len(self.starts)):
+            yield self.cue(i)
+
+
+def count_cues(path, encoding=None):
+    """計算字幕數量（只掃描時間行）"""
+    count = 0
+    with open_srt(path, encoding) as f:
+        for line in f:
+            if '-->' in line and _TIMING_RE.match(line):
+                count += 1
+    return count
+
+
+def format_cue(number, cue):
+    """將字幕格式化為 SRT 文字區塊"""
+    return (
+        f"{number}\n"
+        f"{format_timestamp(cue.start)} --> {format_timestamp(cue.end)}{cue.position}\n"
+        f"{cue.text}\n"
+    )
+
+
+class _Discard(Exception):
+    """丟棄 atomic_open 寫到一半的暫存檔，不取代目標檔案"""
+
+
+@contextmanager
+def atomic_open(path, encoding='utf-8'):
+    """開啟同目錄的暫存檔供寫入，成功結束時才 fsync 並原子性地取代目標檔案"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    try:
+        # mkstemp 建立的檔案權限為 0600，改為與既有檔案一致
+        mode = os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644
+        os.chmod(temp_path, mode)
+        with os.fdopen(fd, 'w', encoding=encoding, newline='\n') as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+        _fsync_dir(directory)
+    except _Discard:
+        pass
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _fsync_dir(directory):
+    """確保改名已寫入磁碟；Windows 無法開啟目錄，略過"""
+    if os.name != 'posix':
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        # 部分網路檔案系統不支援對目錄 fsync
+        pass
+    finally:
+        os.close(fd)
+
+
+class AtomicWriter:
+    """可跨越多次呼叫的 atomic_open：寫入同目錄的暫存檔，成功結束時才取代目標檔案"""
+
+    def __init__(self, path, encoding='utf-8'):
+        self.path = path
+        self.encoding = encoding
+        self.discarded = False
+        self._context = None
+        self._file = None
+
+    def __enter__(self):
+        self._context = atomic_open(self.path, self.encoding)
+        self._file = self._context.__enter__()
+        return self
+
+    def write_text(self, text):
+        self._file.write(text)
+
+    def discard(self):
+        """結束時不取代目標檔案（例如內容沒有變更）"""
+        self.discarded = True
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None and self.discarded:
+            return self._context.__exit__(_Discard, _Discard(), None)
+        return self._context.__exit__(exc_type, exc, tb)
+
+
+class SrtWriter(AtomicWriter):
+    """逐句寫出字幕到同目錄的暫存檔，成功結束時才取代目標檔案"""
+
+    def __init__(self, path, encoding='utf-8'):
+        super().__init__(path, encoding)
+        self.count = 0
+
+    def write(self, cue):
+        """寫出一句字幕，序號依寫出順序重新編排"""
+        self.count += 1
+        self._file.write(format_cue(self.count, cue))
+        self._file.write('\n')
@@ -0,0 +1,46 @@
+import json
+
+from src.translation.manifest import TranslationManifest
+
+HEADER = {"file": "a.srt", "model": "m", "prompt": "p", "source_lang": "English", "target_lang": "French"}
+
+
+def _save(path, entries):
+    manifest = TranslationManifest(str(path), HEADER)
+    for entry in entries:
+        manifest.record(*entry)
+    manifest.save()
+    return manifest
+
+
+def test_entries_are_streamed_in_order_and_reloaded(tmp_path):
+    path = tmp_path / "a.fr.manifest.json"
+    _save(path, [("h1", 0, 1000, "Bonjour"), ("h2", 1000, 2000, "Salut"), ("h1", 5000, 6000, "Bonjour")])
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert [cue[0] for cue in data["cues"]] == ["h1", "h2", "h1"]
+    previous = TranslationManifest(str(path), HEADER).load()
+    assert previous["h1"] == ("Bonjour", {(0, 1000), (5000, 6000)})
+    assert previous["h2"] == ("Salut", {(1000, 2000)})
+
+
+def test_empty_run_writes_empty_manifest(tmp_path):
+    path = tmp_path / "a.fr.manifest.json"
+    _save(path, [])
+    assert TranslationManifest(str(path), HEADER).load() == {}
+    assert json.loads(path.read_text(encoding="utf-8"))["cues"] == []
+
+
+def test_discard_keeps_previous_manifest(tmp_path):
+    path = tmp_path / "a.fr.manifest.json"
+    _save(path, [("h1", 0, 1000, "Bonjour")])
+    manifest = TranslationManifest(str(path), HEADER)
+    manifest.record("h9", 0, 1000, "Interrompu")
+    manifest.discard()
+    assert set(TranslationManifest(str(path), HEADER).load()) == {"h1"}
+    assert [p.name for p in tmp_path.iterdir()] == ["a.fr.manifest.json"]
+
+
+def test_header_change_ignores_manifest(tmp_path):
+    path = tmp_path / "a.fr.manifest.json"
+    _save(path, [("h1", 0, 1000, "Bonjour")])
+    assert TranslationManifest(str(path), dict(HEADER, model="other")).load() == {}
@@ -0,0 +1,56 @@
+from src.translation.translation_thread import (
+    TranslationThread, REQUEST_FAILED, REQUEST_REJECTED, parse_packed_reply, should_requeue
+)
+
+
+class StubThread:
+    """只保留打包請求相關方法的翻譯執行緒，_chat 由測試決定回覆"""
+    debug_mode = False
+    target_lang = "English"
+    fetch = TranslationThread.fetch
+    fetch_packed = TranslationThread.fetch_packed
+    _fetch_packed_split = TranslationThread._fetch_packed_split
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.requests = []
+
+    def _chat(self, user_content):
+        self.requests.append(user_content)
+        return self.reply(user_content)
+
+
+def test_parse_packed_reply_rejects_empty_lines():
+    assert parse_packed_reply("[1] a\n[2] ", 2) is None
+    assert parse_packed_reply("[1] a\n[2] b", 2) == {1: "a", 2: "b"}
+
+
+def test_unparsable_reply_is_split_until_it_succeeds():
+    thread = StubThread(lambda content: "[1] \n[2] " if "numbered" in content else "ok")
+    assert thread._fetch_packed_split(list("abcdefgh")) == ["ok"] * 8
+    assert len(thread.requests) == 15
+
+
+def test_request_failure_is_not_split():
+    thread = StubThread(lambda content: REQUEST_FAILED)
+    results = thread._fetch_packed_split(list("abcdefgh"))
+    assert results == [REQUEST_FAILED] * 8
+    assert not any(results)
+    assert len(thread.requests) == 1
+
+
+def test_missing_numbers_are_resent_alone():
+    def reply(content):
+        if "[3]" in content:
+            return "[1] A\n[2] B"
+        return "C"
+    thread = StubThread(reply)
+    assert thread._fetch_packed_split(["a", "b", "c"]) == ["A", "B", "C"]
+    assert len(thread.requests) == 2
+
+
+def test_only_transient_failures_are_requeued():
+    assert should_requeue(REQUEST_FAILED)
+    assert should_requeue(None)
+    assert not should_requeue(REQUEST_REJECTED)
+    assert not should_requeue("translated")
@@ -0,0 +1,30 @@
+import pytest
+
+from src.translation.ollama_client import OllamaHTTPError
+from src.translation.retry import RetryPolicy
+from src.translation.scheduler import TranslationScheduler
+
+
+def _fail(scheduler, error):
+    with pytest.raises(type(error)):
+        with scheduler.request_slot(RetryPolicy.is_retryable):
+            raise error
+
+
+def test_client_errors_do_not_shrink_adaptive_limit():
+    scheduler = TranslationScheduler(max_requests=8, adaptive=True)
+    limit = scheduler.limiter.limit
+    for _ in range(5):
+        _fail(scheduler, OllamaHTTPError(404, "model not found"))
+    assert scheduler.limiter.limit == limit
+    assert scheduler.limiter.baseline is None
+    assert scheduler.in_flight == 0
+
+
+def test_transient_errors_shrink_adaptive_limit():
+    scheduler = TranslationScheduler(max_requests=8, adaptive=True)
+    limit = scheduler.limiter.limit
+    _fail(scheduler, OllamaHTTPError(503, "busy"))
+    assert scheduler.limiter.limit < limit
+    _fail(scheduler, TimeoutError())
+    assert scheduler.in_flight == 0
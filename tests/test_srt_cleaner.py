@@ -0,0 +1,64 @@
+import pytest
+
+from src.utils.srt_cleaner import SrtCleaner, DEFAULT_RULES
+from src.utils.srt_stream import SrtCue
+
+
+def _clean(texts, rules=DEFAULT_RULES):
+    cues = [SrtCue(i + 1, i * 2000, i * 2000 + 1000, text) for i, text in enumerate(texts)]
+    stats = {"total": 0, "rules": {rule: 0 for rule in SrtCleaner(rules).rules}}
+    kept = [cue.text for cue in SrtCleaner(rules).clean_cues(cues, stats)]
+    return kept, stats["rules"]
+
+
+@pytest.mark.parametrize("text", [
+    "(laughs)",
+    "( music playing )",
+    "(laughs)\n(sighs)",
+    "  (applause)  ",
+])
+def test_default_drops_parenthesised_cues(text):
+    kept, rules = _clean([text, "Hello"])
+    assert kept == ["Hello"]
+    assert rules["sound_effect_cues"] == 1
+
+
+def test_default_drops_empty_cues():
+    kept, rules = _clean(["", "   ", "Hello"])
+    assert kept == ["Hello"]
+    assert rules["empty_cues"] == 2
+
+
+@pytest.mark.parametrize("text", [
+    "[DOOR SLAMS]",
+    "【拍手】",
+    "（笑）",
+    "[]",
+    "(a) (b)",
+    "(laughs)\nHello",
+    "I said (quietly) yes",
+    "<i>Hello</i>",
+    "{\\an8}Top",
+])
+def test_default_keeps_other_cues_unchanged(text):
+    kept, rules = _clean([text])
+    assert kept == [text]
+    assert not any(rules.values())
+
+
+def test_default_keeps_duplicates():
+    kept, _ = _clean(["Hello", "Hello"])
+    assert kept == ["Hello", "Hello"]
+
+
+def test_opt_in_rules():
+    rules = DEFAULT_RULES + ("sound_effects", "html_tags", "ass_tags", "duplicates")
+    kept, counts = _clean(["[DOOR SLAMS]", "<i>Hi</i>", "{\\an8}Hi", "I said (quietly) yes"], rules)
+    assert kept == ["Hi", "I said yes"]
+    assert counts["empty_cues"] == 1
+    assert counts["duplicates"] == 1
+
+
+def test_unknown_rule_is_rejected():
+    with pytest.raises(ValueError):
+        SrtCleaner(("no_such_rule",))
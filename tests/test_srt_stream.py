@@ -0,0 +1,52 @@
+import pytest
+
+from src.utils.srt_cleaner import SrtCleaner
+from src.utils.srt_stream import iter_cues, SrtWriter, SrtCue
+
+
+LATIN1_SRT = "1\r\n00:00:01,000 --> 00:00:02,000\r\nCaf\xe9 cr\xe8me\r\n\r\n2\r\n00:00:03,000 --> 00:00:04,000\r\n(laughs)\r\n".encode("latin-1")
+
+
+def test_iter_cues_rejects_undecodable_bytes(tmp_path):
+    path = tmp_path / "latin1.srt"
+    path.write_bytes(LATIN1_SRT)
+    with pytest.raises(UnicodeDecodeError):
+        list(iter_cues(str(path)))
+
+
+def test_clean_file_leaves_undecodable_source_untouched(tmp_path):
+    path = tmp_path / "latin1.srt"
+    path.write_bytes(LATIN1_SRT)
+    with pytest.raises(UnicodeDecodeError):
+        SrtCleaner().clean_file(str(path))
+    assert path.read_bytes() == LATIN1_SRT
+    assert [p.name for p in tmp_path.iterdir()] == ["latin1.srt"]
+
+
+def test_clean_file_does_not_rewrite_unchanged_file(tmp_path):
+    path = tmp_path / "plain.srt"
+    original = b"7\r\n00:00:01,000 --> 00:00:02,000\r\nHello\r\n"
+    path.write_bytes(original)
+    stats = SrtCleaner().clean_file(str(path))
+    assert stats["removed"] == 0
+    assert path.read_bytes() == original
+
+
+def test_clean_file_keeps_bom_encoding(tmp_path):
+    path = tmp_path / "utf16.srt"
+    text = "1\n00:00:01,000 --> 00:00:02,000\nCafé\n\n2\n00:00:03,000 --> 00:00:04,000\n(laughs)\n"
+    path.write_text(text, encoding="utf-16")
+    stats = SrtCleaner().clean_file(str(path))
+    assert stats["removed"] == 1
+    assert [cue.text for cue in iter_cues(str(path))] == ["Café"]
+    assert path.read_bytes()[:2] in (b"\xff\xfe", b"\xfe\xff")
+
+
+def test_writer_discard_keeps_target(tmp_path):
+    path = tmp_path / "out.srt"
+    path.write_text("old", encoding="utf-8")
+    with SrtWriter(str(path)) as writer:
+        writer.write(SrtCue(1, 0, 1000, "new"))
+        writer.discard()
+    assert path.read_text(encoding="utf-8") == "old"
+    assert [p.name for p in tmp_path.iterdir()] == ["out.srt"]